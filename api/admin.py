@@ -1,7 +1,8 @@
 from django.contrib import admin
 
 # Register your models here.
-from .models import Employee, Menu, Restaurant, User, Vote
+from .models import (Employee, Menu, Restaurant, RestaurantDailyTally, User,
+                     Vote)
 
 # class UserAdmin(admin.ModelAdmin):
 #     fields = __all__
@@ -11,3 +12,4 @@ admin.site.register(Employee)
 admin.site.register(Restaurant)
 admin.site.register(Menu)
 admin.site.register(Vote)
+admin.site.register(RestaurantDailyTally)
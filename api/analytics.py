@@ -0,0 +1,61 @@
+"""Vote analytics over a range of days, see ``vote_analytics``."""
+
+from django.db.models import F, Func, OuterRef, Subquery
+
+from api.models import Employee, RestaurantDailyTally
+
+
+def vote_analytics(date_from, date_to):
+    """Return the votes of every restaurant on every day between
+    ``date_from`` and ``date_to`` (inclusive) that has votes, as a compact
+    matrix with the participation rate and the winner of each day.
+
+    ``votes[i][j]`` is the number of votes of ``restaurants[j]`` on
+    ``days[i]``. The participation rate divides the votes of a day by the
+    employees who had joined by then. Everything comes from one query on the
+    daily tallies with the employee count as a correlated subquery.
+    """
+    employees = (
+        Employee.objects.filter(date_joined__date__lte=OuterRef("date"))
+        .order_by()
+        .annotate(total=Func(F("pk"), function="COUNT"))
+        .values("total")
+    )
+    rows = (
+        RestaurantDailyTally.objects.filter(
+            date__gte=date_from, date__lte=date_to, vote_count__gt=0
+        )
+        .annotate(employees=Subquery(employees))
+        .order_by("date", "restaurant_id")
+        .values_list("date", "restaurant_id", "vote_count", "employees")
+    )
+    days = {}
+    restaurant_ids = set()
+    for date, restaurant_id, vote_count, employee_count in rows:
+        days.setdefault(date, ({}, employee_count))[0][restaurant_id] = vote_count
+        restaurant_ids.add(restaurant_id)
+
+    restaurants = sorted(restaurant_ids)
+    votes, participation, winners = [], [], []
+    for counts, employee_count in days.values():
+        votes.append([counts.get(restaurant_id, 0) for restaurant_id in restaurants])
+        total = sum(counts.values())
+        participation.append(
+            round(total / employee_count, 4) if employee_count else None
+        )
+        # Ties go to the lowest restaurant id, like the winner endpoints.
+        winners.append(
+            min(
+                counts,
+                key=lambda restaurant_id: (-counts[restaurant_id], restaurant_id),
+            )
+        )
+    return {
+        "from": date_from,
+        "to": date_to,
+        "restaurants": restaurants,
+        "days": list(days),
+        "votes": votes,
+        "participation": participation,
+        "winners": winners,
+    }
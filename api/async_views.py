@@ -0,0 +1,177 @@
+"""Native async versions of the vote-create and winning-restaurant endpoints.
+
+Under ASGI the DRF viewsets run in a worker thread for the whole request.
+These views stay on the event loop and only hop to a thread for the
+database work itself, which runs on a bounded pool sized to the number of
+database connections (``ASYNC_DB_WORKERS``). Thousands of requests can wait
+on the loop while at most that many hold a connection.
+
+Only JWT authentication is supported here, decoding a token needs no
+database access, nor does its user when the token carries the claims of
+``api.authentication.ClaimsJWTAuthentication``.
+
+Vote creation is throttled like the vote viewset, by client IP and claimed
+user before the token is decoded and by user after it.
+"""
+import asyncio
+import datetime
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.http import Http404, HttpResponseNotAllowed, JsonResponse
+from rest_framework import exceptions, status
+
+from api.authentication import ClaimsJWTAuthentication
+from api.cache import winner_cache
+from api.permissions import IsEmployeeUserOrAdmin
+from api.serializers import VoteSerializer, WinnerSerializer
+from api.throttling import ClaimedUserThrottle, ClientIPThrottle, UserThrottle
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.ASYNC_DB_WORKERS, thread_name_prefix="async-db"
+        )
+    return _executor
+
+
+def _call_db(func, *args):
+    try:
+        return func(*args)
+    except DatabaseError:
+        # Drop broken connections so the next job on this thread reconnects.
+        for connection in connections.all():
+            if not connection.is_usable():
+                connection.close()
+        raise
+
+
+async def run_db(func, *args):
+    """Run ``func`` doing ORM work off the event loop.
+
+    Pool threads keep their connection open between jobs, so the pool acts
+    as a connection pool. With ``ASYNC_DB_WORKERS = 0`` the work runs on
+    Django's thread sensitive executor instead, which tests rely on to share
+    the test transaction.
+    """
+    if not settings.ASYNC_DB_WORKERS:
+        return await sync_to_async(func)(*args)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), _call_db, func, *args)
+
+
+async def authenticate(request):
+    """Set ``request.user`` from the bearer token, raising
+    ``NotAuthenticated`` if there is none."""
+    authenticator = ClaimsJWTAuthentication()
+    header = authenticator.get_header(request)
+    raw_token = header and authenticator.get_raw_token(header)
+    if not raw_token:
+        raise exceptions.NotAuthenticated()
+    validated_token = authenticator.get_validated_token(raw_token)
+    if authenticator.has_claims(validated_token):
+        request.user = authenticator.get_user(validated_token)
+    else:
+        request.user = await run_db(authenticator.get_user, validated_token)
+
+
+async def check_throttles(request, throttle_classes, scope):
+    """Raise ``Throttled`` when one of ``throttle_classes`` refuses the
+    request, counted under the rates of ``scope``. Counters shared through
+    a cache are updated off the event loop."""
+    view = SimpleNamespace(throttle_scope=scope)
+
+    def refused():
+        waits = []
+        for throttle_class in throttle_classes:
+            throttle = throttle_class()
+            if not throttle.allow_request(request, view):
+                waits.append(throttle.wait())
+        return waits
+
+    if settings.THROTTLE_STORE["BACKEND"] == "cache":
+        waits = await sync_to_async(refused, thread_sensitive=False)()
+    else:
+        waits = refused()
+    if waits:
+        raise exceptions.Throttled(
+            max((wait for wait in waits if wait is not None), default=None)
+        )
+
+
+async def check_permissions(request):
+    await authenticate(request)
+    if not IsEmployeeUserOrAdmin().has_permission(request, None):
+        raise exceptions.PermissionDenied()
+
+
+def error_response(exc):
+    if isinstance(exc, Http404):
+        exc = exceptions.NotFound()
+    detail = exc.detail
+    if not isinstance(detail, (list, dict)):
+        detail = {"detail": detail}
+    response = JsonResponse(detail, status=exc.status_code, safe=False)
+    if getattr(exc, "wait", None) is not None:
+        response["Retry-After"] = str(exc.wait)
+    return response
+
+
+def create_vote(request, data):
+    serializer = VoteSerializer(data=data, context={"request": request})
+    serializer.is_valid(raise_exception=True)
+    serializer.save()
+    return serializer.data
+
+
+async def vote_create(request):
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+    try:
+        await check_throttles(request, (ClientIPThrottle, ClaimedUserThrottle), "vote")
+        await check_permissions(request)
+        await check_throttles(request, (UserThrottle,), "vote")
+        try:
+            data = json.loads(request.body)
+        except ValueError:
+            raise exceptions.ParseError()
+        logger.info(f"User {request.user} POST vote-async with data {data}")
+        vote = await run_db(create_vote, request, data)
+    except (exceptions.APIException, Http404) as exc:
+        return error_response(exc)
+    return JsonResponse(vote, status=status.HTTP_201_CREATED)
+
+
+def get_winner():
+    return WinnerSerializer(winner_cache.winner(datetime.date.today()), many=True).data
+
+
+async def winning_restaurant(request):
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+    try:
+        await check_permissions(request)
+    except exceptions.APIException as exc:
+        return error_response(exc)
+    logger.info(f"User {request.user} GET winning-restaurant-async")
+    results = await run_db(get_winner)
+    return JsonResponse(
+        {"count": len(results), "next": None, "previous": None, "results": results}
+    )
+
+
+# Token authenticated API views, CSRF does not apply. csrf_exempt() can not
+# wrap coroutine functions on this Django version, so mark them directly.
+vote_create.csrf_exempt = True
+winning_restaurant.csrf_exempt = True
@@ -0,0 +1,189 @@
+"""Authentication classes of the API.
+
+``CachedBasicAuthentication``
+    HTTP Basic authentication. ``BasicAuthentication`` runs the password
+    hasher (PBKDF2, tens of milliseconds) on every request, this class
+    remembers a successful verification for ``BASIC_AUTH_CACHE["TIMEOUT"]``
+    seconds under an HMAC of username and password, so the plain password
+    never reaches the cache. An entry is only used while the user's stored
+    password hash is still the one it was verified against, so a password
+    changed anywhere misses, and while the user's generation counter is
+    unchanged, bumped by ``invalidate_credentials`` when a password is
+    changed through the API.
+
+``ClaimsJWTAuthentication``
+    JWT authentication without a user lookup. Tokens issued by
+    ``ClaimsRefreshToken`` carry ``user_type``, ``is_staff`` and the
+    employee or restaurant pk as claims, and the request user becomes a
+    ``ClaimsUser`` built from them. It loads the ``User`` row only when an
+    attribute beyond the claims is read. Tokens without the claims are
+    authenticated against the database as before.
+
+    Being stateless, an access token is accepted, with the claims it was
+    issued with, until it expires (``ACCESS_TOKEN_LIFETIME``) even if its
+    user is deactivated, deleted or loses staff status meanwhile. Refreshing
+    (``ClaimsTokenRefreshSerializer``) reloads the user, refuses inactive or
+    deleted ones and issues the current claims.
+"""
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils.crypto import constant_time_compare, salted_hmac
+from django.utils.functional import cached_property
+from rest_framework.authentication import BasicAuthentication
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.models import Employee, Restaurant
+
+_KEY_SALT = "api.authentication.CachedBasicAuthentication"
+
+
+def _cache():
+    return caches[settings.BASIC_AUTH_CACHE["ALIAS"]]
+
+
+def _credentials_key(username, password):
+    digest = salted_hmac(_KEY_SALT, f"{username}\0{password}", algorithm="sha256")
+    return f"basic-auth:{digest.hexdigest()}"
+
+
+def _generation_key(username):
+    return f"basic-auth-generation:{username}"
+
+
+def _fingerprint(user):
+    return salted_hmac(_KEY_SALT, user.password, algorithm="sha256").hexdigest()
+
+
+def invalidate_credentials(user):
+    """Drop the cached verifications of ``user``, e.g. after a password
+    change."""
+    key = _generation_key(user.pk)
+    _cache().add(key, 0, None)
+    try:
+        _cache().incr(key)
+    except ValueError:
+        # Evicted between add and incr, a missing counter is new anyway.
+        _cache().add(key, 1, None)
+
+
+class CachedBasicAuthentication(BasicAuthentication):
+    def authenticate_credentials(self, userid, password, request=None):
+        credentials_key = _credentials_key(userid, password)
+        generation_key = _generation_key(userid)
+        values = _cache().get_many([credentials_key, generation_key])
+        cached = values.get(credentials_key)
+        generation = values.get(generation_key, 0)
+        if cached is not None and cached[1] == generation:
+            user = self.cached_user(userid, cached[0])
+            if user is not None:
+                return (user, None)
+
+        user, auth = super().authenticate_credentials(userid, password, request)
+        _cache().set(
+            credentials_key,
+            (_fingerprint(user), generation),
+            settings.BASIC_AUTH_CACHE["TIMEOUT"],
+        )
+        return (user, auth)
+
+    def cached_user(self, userid, fingerprint):
+        """Return the user of a cached verification, or ``None`` when it no
+        longer holds."""
+        user = get_user_model()._default_manager.filter(pk=userid).first()
+        if (
+            user is None
+            or not user.is_active
+            or not constant_time_compare(_fingerprint(user), fingerprint)
+        ):
+            return None
+        return user
+
+
+CLAIMS = ("user_type", "is_staff", "employee_id", "restaurant_id")
+
+
+def user_claims(user):
+    return {
+        "user_type": user.user_type,
+        "is_staff": user.is_staff,
+        "employee_id": Employee.objects.filter(user=user)
+        .values_list("pk", flat=True)
+        .first(),
+        "restaurant_id": Restaurant.objects.filter(user=user)
+        .values_list("pk", flat=True)
+        .first(),
+    }
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """Refresh token carrying ``CLAIMS``, access tokens created from it copy
+    them."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token.set_claims(user)
+        return token
+
+    def set_claims(self, user):
+        for claim, value in user_claims(user).items():
+            self[claim] = value
+
+
+class ClaimsUser(TokenUser):
+    """Request user built from the claims of an access token."""
+
+    def __str__(self):
+        return str(self.pk)
+
+    @cached_property
+    def username(self):
+        return self.pk
+
+    @cached_property
+    def user_type(self):
+        return self.token["user_type"]
+
+    @cached_property
+    def is_staff(self):
+        return self.token["is_staff"]
+
+    @cached_property
+    def employee_id(self):
+        return self.token["employee_id"]
+
+    @cached_property
+    def restaurant_id(self):
+        return self.token["restaurant_id"]
+
+    @cached_property
+    def user(self):
+        """The ``User`` row, loaded on first use."""
+        return get_user_model()._default_manager.get(pk=self.pk)
+
+    def __getattr__(self, name):
+        # Only called for attributes the claims do not cover.
+        if name.startswith("_") or name == "token":
+            raise AttributeError(name)
+        return getattr(self.user, name)
+
+    def __eq__(self, other):
+        return self.pk == getattr(other, "pk", None)
+
+    def __hash__(self):
+        return hash(self.pk)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    @staticmethod
+    def has_claims(validated_token):
+        return all(claim in validated_token for claim in CLAIMS)
+
+    def get_user(self, validated_token):
+        if self.has_claims(validated_token):
+            return ClaimsUser(validated_token)
+        return super().get_user(validated_token)
@@ -0,0 +1,185 @@
+"""Caches shared by the API views.
+
+``winner_cache`` holds the daily restaurant ranking behind the
+winning-restaurant API. ``table_versions`` reads and bumps the version per
+table (``TableVersion`` rows) behind the conditional GET validators and
+list snapshots of the menu and restaurant endpoints.
+
+For the ranking every date has a version counter next to it. A vote change
+bumps the counter of its date, once right away and once more after the
+transaction commits, and a cached ranking only counts as a hit when it was
+computed under the current counter. A reader that computed the ranking
+while a vote was being committed therefore can not leave a stale entry
+behind. With a shared cache backend (memcached, redis) the counters are
+shared too and every worker sees the invalidation.
+"""
+
+import logging
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from api.models import (Menu, Restaurant, RestaurantDailyTally, TableVersion,
+                        User, Vote, tally_changed)
+from api.routers import reading_from_replica
+from api.utils import UserTypes
+
+logger = logging.getLogger(__name__)
+
+
+class WinnerCache:
+    """Daily ranking (``RestaurantDailyTally.objects.ranking``) cached per date."""
+
+    prefix = "winner"
+
+    def __init__(self, alias="default", timeout=300):
+        self.alias = alias
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def ranking(self, date):
+        """Return the ranking of ``date`` as a list of dicts with
+        ``restaurant_id`` and ``total_votes``, best first."""
+        version_key = self._key("version", "all")
+        date_version_key = self._key("version", date)
+        ranking_key = self._key("ranking", date)
+        values = self.cache.get_many([version_key, date_version_key, ranking_key])
+        version = (values.get(version_key, 0), values.get(date_version_key, 0))
+        from_replica = reading_from_replica()
+        cached = values.get(ranking_key)
+        # A replica may not have applied the vote that bumped the version yet.
+        # Its rankings are only served to other replica reads, never to reads
+        # pinned to the primary to see their own writes.
+        if (
+            cached is not None
+            and cached[0] == version
+            and (from_replica or not cached[2])
+        ):
+            self._count(hit=True)
+            return cached[1]
+        self._count(hit=False)
+        ranking = list(RestaurantDailyTally.objects.ranking(date))
+        timeout = self.timeout
+        if from_replica:
+            # Kept no longer than the lag reads from a replica may have.
+            timeout = min(timeout, settings.READ_YOUR_WRITES["SECONDS"])
+        self.cache.set(ranking_key, (version, ranking, from_replica), timeout)
+        return ranking
+
+    def winner(self, date):
+        return self.ranking(date)[:1]
+
+    def invalidate(self, date=None):
+        """Drop the cached ranking of ``date``, or of every date."""
+        key = self._key("version", "all" if date is None else date)
+        if self.cache.add(key, 1, timeout=None):
+            return
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            # Evicted between add() and incr(), a fresh counter is new too.
+            self.cache.set(key, 1, timeout=None)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = self.misses = 0
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _key(self, kind, date):
+        return f"{self.prefix}:{kind}:{date}"
+
+
+winner_cache = WinnerCache(
+    alias=settings.WINNER_CACHE["ALIAS"], timeout=settings.WINNER_CACHE["TIMEOUT"]
+)
+
+
+def invalidate_on_commit(date, using):
+    winner_cache.invalidate(date)
+    transaction.on_commit(lambda: winner_cache.invalidate(date), using=using)
+
+
+@receiver(post_save, sender=Vote)
+@receiver(post_delete, sender=Vote)
+def invalidate_winner_for_vote(sender, instance, using, **kwargs):
+    invalidate_on_commit(instance.date_voted, using)
+
+
+@receiver(tally_changed)
+def invalidate_winner_for_tally(sender, date, using, **kwargs):
+    """``Vote.objects.bulk_create`` sends no ``post_save``, its tally
+    updates still change the ranking."""
+    invalidate_on_commit(date, using)
+
+
+class TableVersions:
+    """Version token and modification time per table in ``TableVersion``,
+    replaced in the transaction of every save or delete. Being in the
+    database, a change made by any worker is seen by all of them, and a
+    version read before the rows is never newer than them."""
+
+    def get(self, *models):
+        """Return ``(token, last_modified)`` combining the versions of
+        ``models``, ``last_modified`` being a UNIX timestamp."""
+        labels = [model._meta.label_lower for model in models]
+        versions = {
+            version.label: version
+            for version in TableVersion.objects.filter(label__in=labels)
+        }
+        for label in labels:
+            if label not in versions:
+                versions[label], _ = TableVersion.objects.get_or_create(
+                    label=label, defaults=self._new_version()
+                )
+        token = ".".join(versions[label].token for label in labels)
+        last_modified = max(versions[label].modified for label in labels)
+        return token, int(last_modified.timestamp())
+
+    def bump(self, model, using=None):
+        TableVersion.objects.using(using).update_or_create(
+            label=model._meta.label_lower, defaults=self._new_version()
+        )
+
+    def _new_version(self):
+        return {"token": uuid.uuid4().hex, "modified": timezone.now()}
+
+
+table_versions = TableVersions()
+
+
+@receiver(post_save, sender=Menu)
+@receiver(post_delete, sender=Menu)
+@receiver(post_save, sender=Restaurant)
+@receiver(post_delete, sender=Restaurant)
+def bump_table_version(sender, using, **kwargs):
+    table_versions.bump(sender, using)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def bump_restaurant_version_for_user(sender, instance, using, **kwargs):
+    """Restaurant responses include the username and email of the user."""
+    if instance.user_type == UserTypes.RESTAURANT:
+        table_versions.bump(Restaurant, using)
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+# Backends keeping their entries in the memory of each process.
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+@register(Tags.caches)
+def check_read_your_writes_cache(app_configs, **kwargs):
+    """With replicas the writes of a user must pin their reads to the
+    primary in every worker, not only in the one that served the write."""
+    if not settings.DATABASE_REPLICAS:
+        return []
+    alias = settings.READ_YOUR_WRITES["ALIAS"]
+    backend = settings.CACHES.get(alias, {}).get("BACKEND")
+    if backend in PROCESS_LOCAL_CACHES:
+        return [
+            Error(
+                f"READ_YOUR_WRITES uses the per-process cache {alias!r}.",
+                hint=(
+                    "Point READ_YOUR_WRITES['ALIAS'] at a cache shared by all "
+                    "workers, e.g. DatabaseCache or memcached."
+                ),
+                id="api.E001",
+            )
+        ]
+    return []
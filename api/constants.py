@@ -1 +1,5 @@
 MAX_CONSECUTIVE_WINNINGS = 2
+MAX_VOTE_BATCH_SIZE = 5000
+MAX_DATE_RANGE_DAYS = 366
+MAX_EMPLOYEE_IMPORT_SIZE = 50000
+MAX_EMPLOYEE_IMPORT_REQUEST_SIZE = 50
@@ -0,0 +1,80 @@
+"""Streaming export of the full vote history.
+
+Rows are read with ``QuerySet.iterator()``, a server-side cursor on
+PostgreSQL, and written out chunk by chunk, so memory use does not depend
+on the number of votes exported.
+"""
+import csv
+import json
+
+from api.models import Vote
+
+CHUNK_SIZE = 2000
+
+# (column, values() lookup) of every exported vote.
+EXPORT_COLUMNS = (
+    ("id", "id"),
+    ("date_voted", "date_voted"),
+    ("restaurant_id", "restaurant_id"),
+    ("restaurant_name", "restaurant__restaurant_name"),
+    ("menu_id", "menu_id"),
+    ("menu_title", "menu__title"),
+    ("employee_id", "employee_id"),
+    ("username", "employee__user_id"),
+)
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+class _Echo:
+    """File-like object handing back what ``csv.writer`` writes to it."""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset=None):
+    """Iterate over the exported columns of ``queryset`` (all votes by
+    default) as tuples, oldest first."""
+    if queryset is None:
+        queryset = Vote.objects.all()
+    return (
+        queryset.order_by("date_voted", "id")
+        .values_list(*(lookup for _, lookup in EXPORT_COLUMNS))
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+
+def csv_chunks(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([column for column, _ in EXPORT_COLUMNS])
+    chunk = []
+    for row in rows:
+        chunk.append(writer.writerow(row))
+        if len(chunk) == CHUNK_SIZE:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+
+def ndjson_chunks(rows):
+    columns = [column for column, _ in EXPORT_COLUMNS]
+    chunk = []
+    for row in rows:
+        chunk.append(json.dumps(dict(zip(columns, row)), default=str) + "\n")
+        if len(chunk) == CHUNK_SIZE:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+
+def export_chunks(export_format, queryset=None):
+    """Iterate over the text chunks of the export in ``export_format``, one
+    of ``EXPORT_FORMATS``."""
+    chunks = {"csv": csv_chunks, "ndjson": ndjson_chunks}[export_format]
+    return chunks(export_rows(queryset))
@@ -0,0 +1,246 @@
+import asyncio
+import datetime
+import json
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.dispatch import receiver
+
+from api.async_views import run_db
+from api.models import RestaurantDailyTally, tally_changed
+
+
+class Leaderboard:
+    """Today's vote count per restaurant, kept in memory by every worker.
+
+    Votes committed by this process are applied as they land. Votes written
+    by other processes are picked up by reloading the tallies from the
+    database at most every ``resync_interval`` seconds while someone waits
+    for changes, by one of the waiters for all of them.
+
+    Threads wait with ``wait``, coroutines with ``wait_async``, which wakes
+    them through their event loop.
+    """
+
+    def __init__(self, resync_interval=5):
+        self.resync_interval = resync_interval
+        self._condition = threading.Condition()
+        self._resync_lock = threading.Lock()
+        self._waiters = set()
+        self._date = None
+        self._counts = Counter()
+        self._version = 0
+        self._synced_at = 0
+
+    def add(self, restaurant_id, date, count):
+        with self._condition:
+            if date != self._date:
+                return
+            self._counts[restaurant_id] += count
+            self._changed()
+
+    def sync(self):
+        """Reload today's tallies from the database."""
+        today = datetime.date.today()
+        counts = Counter(
+            {
+                row["restaurant_id"]: row["total_votes"]
+                for row in RestaurantDailyTally.objects.ranking(today)
+            }
+        )
+        with self._condition:
+            self._synced_at = time.monotonic()
+            if today != self._date or counts != self._counts:
+                self._date = today
+                self._counts = counts
+                self._changed()
+
+    def ranking(self):
+        with self._condition:
+            return self._version, self._ranking()
+
+    def wait(self, version, timeout):
+        """Block until the ranking differs from ``version`` or ``timeout``
+        seconds pass, then return ``(version, ranking)``."""
+        deadline = time.monotonic() + timeout
+        while True:
+            if self._claim_resync():
+                try:
+                    self.sync()
+                finally:
+                    self._resync_lock.release()
+            with self._condition:
+                remaining = deadline - time.monotonic()
+                if self._version != version or remaining <= 0:
+                    return self._version, self._ranking()
+                self._condition.wait(min(remaining, self.resync_interval))
+
+    async def wait_async(self, version, timeout):
+        """``wait`` for coroutines, reloading the tallies with ``run_db``."""
+        deadline = time.monotonic() + timeout
+        event = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), event)
+        with self._condition:
+            self._waiters.add(waiter)
+        try:
+            while True:
+                if self._claim_resync():
+                    try:
+                        await run_db(self.sync)
+                    finally:
+                        self._resync_lock.release()
+                with self._condition:
+                    remaining = deadline - time.monotonic()
+                    if self._version != version or remaining <= 0:
+                        return self._version, self._ranking()
+                    event.clear()
+                try:
+                    await asyncio.wait_for(
+                        event.wait(), min(remaining, self.resync_interval)
+                    )
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self._condition:
+                self._waiters.discard(waiter)
+
+    def _claim_resync(self):
+        """Whether the tallies are due to be reloaded and no other waiter is
+        reloading them, in which case the caller holds ``_resync_lock``."""
+        if (
+            self._date == datetime.date.today()
+            and time.monotonic() - self._synced_at < self.resync_interval
+        ):
+            return False
+        return self._resync_lock.acquire(blocking=False)
+
+    def _changed(self):
+        # Called holding the condition.
+        self._version += 1
+        self._condition.notify_all()
+        for loop, event in self._waiters:
+            loop.call_soon_threadsafe(event.set)
+
+    def _ranking(self):
+        return [
+            {"restaurant_id": restaurant_id, "total_votes": total_votes}
+            for restaurant_id, total_votes in sorted(
+                self._counts.items(), key=lambda item: (-item[1], item[0])
+            )
+            if total_votes > 0
+        ]
+
+
+leaderboard = Leaderboard(resync_interval=settings.LEADERBOARD_RESYNC_SECONDS)
+
+
+@receiver(tally_changed)
+def update_leaderboard(sender, restaurant_id, date, count, using, **kwargs):
+    transaction.on_commit(
+        lambda: leaderboard.add(restaurant_id, date, count), using=using
+    )
+
+
+class StreamSlots:
+    """Open streams of this process, at most ``LEADERBOARD_MAX_STREAMS``."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._open = 0
+
+    def acquire(self):
+        """Take a slot, or return ``False`` when all are taken."""
+        with self._lock:
+            if self._open >= settings.LEADERBOARD_MAX_STREAMS:
+                return False
+            self._open += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self._open -= 1
+
+
+stream_slots = StreamSlots()
+
+
+class RankingStream:
+    """Events of ``ranking_events`` or ``async_ranking_events`` holding one
+    of the ``stream_slots`` until closed. Django closes the content of a
+    streaming response once it is done with it, iterated or not."""
+
+    def __init__(self, events):
+        self.events = events
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self.events)
+
+    def __aiter__(self):
+        return self
+
+    def __anext__(self):
+        return self.events.__anext__()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            stream_slots.release()
+            self.events.close()
+
+    async def aclose(self):
+        if not self.closed:
+            self.closed = True
+            stream_slots.release()
+            await self.events.aclose()
+
+
+def release_connections():
+    """Close the database connections of this thread, a stream must not hold
+    one while it waits for the next change."""
+    for connection in connections.all():
+        if not connection.in_atomic_block:
+            connection.close()
+
+
+def ranking_event(version, ranking):
+    return f"id: {version}\nevent: ranking\ndata: {json.dumps(ranking)}\n\n"
+
+
+KEEP_ALIVE = ": keep-alive\n\n"
+
+
+def ranking_events(board, heartbeat):
+    """Server-Sent Events with the full ranking whenever it changes and a
+    comment line every ``heartbeat`` seconds to keep proxies from closing
+    the connection. The first event is read fresh from the database."""
+    board.sync()
+    version = None
+    while True:
+        new_version, ranking = board.wait(version, timeout=heartbeat)
+        release_connections()
+        if new_version == version:
+            yield KEEP_ALIVE
+            continue
+        version = new_version
+        yield ranking_event(version, ranking)
+
+
+async def async_ranking_events(board, heartbeat):
+    """``ranking_events`` waiting on the event loop, the database work runs
+    on the ``run_db`` threads."""
+    await run_db(board.sync)
+    version = None
+    while True:
+        new_version, ranking = await board.wait_async(version, timeout=heartbeat)
+        if new_version == version:
+            yield KEEP_ALIVE
+            continue
+        version = new_version
+        yield ranking_event(version, ranking)
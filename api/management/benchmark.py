@@ -0,0 +1,145 @@
+import abc
+import datetime
+import random
+import statistics
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import BaseCommand
+from django.db import connection, reset_queries, transaction
+from django.test.utils import CaptureQueriesContext
+
+from api.models import Employee, Menu, Restaurant, User, Vote
+from api.utils import UserTypes
+
+BATCH_SIZE = 10000
+
+
+def seed_votes(total_votes, employees=500, restaurants=10, seed=0):
+    """Create ``total_votes`` historical votes, one per employee per day,
+    ending yesterday. Returns the created restaurants."""
+    rng = random.Random(seed)
+    password = make_password(None)
+    users = [
+        User(
+            username=f"bench-restaurant-{index}",
+            user_type=UserTypes.RESTAURANT,
+            password=password,
+        )
+        for index in range(restaurants)
+    ] + [
+        User(
+            username=f"bench-employee-{index}",
+            user_type=UserTypes.EMPLOYEE,
+            password=password,
+        )
+        for index in range(employees)
+    ]
+    User.objects.bulk_create(users, batch_size=BATCH_SIZE)
+    Restaurant.objects.bulk_create(
+        [
+            Restaurant(user=user, restaurant_name=user.username)
+            for user in users[:restaurants]
+        ]
+    )
+    Employee.objects.bulk_create(
+        [Employee(user=user) for user in users[restaurants:]], batch_size=BATCH_SIZE
+    )
+    restaurant_list = list(Restaurant.objects.filter(user__in=users[:restaurants]))
+    employee_ids = list(
+        Employee.objects.filter(user__in=users[restaurants:]).values_list(
+            "pk", flat=True
+        )
+    )
+    Menu.objects.bulk_create(
+        [
+            Menu(restaurant=restaurant, title="Bench menu", description="")
+            for restaurant in restaurant_list
+        ]
+    )
+    menu_ids = dict(
+        Menu.objects.filter(restaurant__in=restaurant_list).values_list(
+            "restaurant_id", "pk"
+        )
+    )
+    restaurant_ids = [restaurant.pk for restaurant in restaurant_list]
+    weights = [rng.random() for _ in restaurant_ids]
+
+    day = datetime.date.today()
+    batch = []
+    for index in range(total_votes):
+        if index % len(employee_ids) == 0:
+            day -= datetime.timedelta(days=1)
+        restaurant_id = rng.choices(restaurant_ids, weights)[0]
+        batch.append(
+            Vote(
+                restaurant_id=restaurant_id,
+                menu_id=menu_ids[restaurant_id],
+                employee_id=employee_ids[index % len(employee_ids)],
+                date_voted=day,
+            )
+        )
+        if len(batch) == BATCH_SIZE:
+            Vote.objects.bulk_create(batch)
+            batch = []
+    Vote.objects.bulk_create(batch)
+    return restaurant_list
+
+
+def measure(func, repeat):
+    """Run ``func`` ``repeat`` times and return (median ms, queries per call)."""
+    timings = []
+    for _ in range(repeat):
+        # The query log is capped, a full one can not be measured.
+        reset_queries()
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), len(queries)
+
+
+class BenchmarkCommand(BaseCommand, metaclass=abc.ABCMeta):
+    """Base for benchmark commands.
+
+    Every dataset size is seeded inside a transaction which is rolled back
+    afterwards, so benchmarks never leave rows behind. Subclasses implement
+    ``run_benchmark`` and may override ``seed``.
+    """
+
+    default_sizes = [10000, 100000, 1000000]
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            nargs="+",
+            type=int,
+            default=self.default_sizes,
+            help="Number of historical votes to seed for each run.",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=20,
+            help="Number of timed calls per case.",
+        )
+
+    def handle(self, *args, **options):
+        for size in options["sizes"]:
+            self.stdout.write(f"Seeding {size} votes...")
+            with transaction.atomic():
+                self.seed(size)
+                self.run_benchmark(size, options)
+                transaction.set_rollback(True)
+
+    def seed(self, size):
+        seed_votes(size)
+
+    @abc.abstractmethod
+    def run_benchmark(self, size, options):
+        """Time the cases on the seeded data and ``report`` them."""
+
+    def report(self, size, name, median_ms, queries):
+        self.stdout.write(
+            f"{size:>10} votes  {name:<30} {median_ms:>10.2f} ms  {queries:>3} queries"
+        )
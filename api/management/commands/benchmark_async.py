@@ -0,0 +1,146 @@
+import asyncio
+import datetime
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management import BaseCommand
+from django.test import AsyncClient, Client
+from django.test.utils import setup_test_environment
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.management.benchmark import seed_votes
+from api.models import Employee, Menu, User, Vote
+
+
+class Command(BaseCommand):
+    """Unlike the other benchmarks the seeded rows are committed, the WSGI
+    threads and the async database pool use their own connections. They are
+    deleted again when the benchmark ends."""
+
+    help = "Compare the async vote and winner endpoints with the WSGI viewsets."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=1000,
+            help="Requests per case, also the number of voting employees.",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=100,
+            help="Requests in flight at the same time.",
+        )
+        parser.add_argument(
+            "--history",
+            type=int,
+            default=10000,
+            help="Number of historical votes to seed.",
+        )
+
+    def handle(self, *args, **options):
+        self.concurrency = options["concurrency"]
+        setup_test_environment()
+        try:
+            restaurants = seed_votes(options["history"], employees=options["requests"])
+            menus = dict(
+                Menu.objects.filter(restaurant__in=restaurants).values_list(
+                    "restaurant_id", "pk"
+                )
+            )
+            employees = Employee.objects.filter(
+                user__username__startswith="bench-"
+            ).select_related("user")
+            self.votes = [
+                (
+                    f"Bearer {AccessToken.for_user(employee.user)}",
+                    {
+                        "restaurant": restaurants[0].pk,
+                        "menu": menus[restaurants[0].pk],
+                        "employee": employee.pk,
+                    },
+                )
+                for employee in employees
+            ]
+            cases = [
+                (
+                    "winner",
+                    reverse("winning-restaurant-list"),
+                    "winning-restaurant-async",
+                ),
+                ("vote", reverse("vote-list"), "vote-async"),
+            ]
+            for name, wsgi_url, asgi_name in cases:
+                self.report(name, "wsgi", self.run_wsgi(name, wsgi_url))
+                self.clear_todays_votes(restaurants)
+                self.report(name, "asgi", self.run_asgi(name, reverse(asgi_name)))
+                self.clear_todays_votes(restaurants)
+        finally:
+            User.objects.filter(username__startswith="bench-").delete()
+
+    def clear_todays_votes(self, restaurants):
+        Vote.objects.filter(
+            restaurant__in=restaurants, date_voted=datetime.date.today()
+        ).delete()
+
+    def run_wsgi(self, name, url):
+        def call(vote):
+            token, data = vote
+            client = Client()
+            start = time.perf_counter()
+            if name == "vote":
+                resp = client.post(
+                    url,
+                    data,
+                    content_type="application/json",
+                    HTTP_AUTHORIZATION=token,
+                )
+            else:
+                resp = client.get(url, HTTP_AUTHORIZATION=token)
+            return time.perf_counter() - start, resp.status_code
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(self.concurrency) as executor:
+            results = list(executor.map(call, self.votes))
+        return time.perf_counter() - start, results
+
+    def run_asgi(self, name, url):
+        async def call(client, semaphore, vote):
+            token, data = vote
+            async with semaphore:
+                start = time.perf_counter()
+                if name == "vote":
+                    resp = await client.post(
+                        url,
+                        data,
+                        content_type="application/json",
+                        authorization=token,
+                    )
+                else:
+                    resp = await client.get(url, authorization=token)
+                return time.perf_counter() - start, resp.status_code
+
+        async def run():
+            client = AsyncClient()
+            semaphore = asyncio.Semaphore(self.concurrency)
+            return await asyncio.gather(
+                *(call(client, semaphore, vote) for vote in self.votes)
+            )
+
+        start = time.perf_counter()
+        results = asyncio.run(run())
+        return time.perf_counter() - start, results
+
+    def report(self, name, path, result):
+        elapsed, results = result
+        latencies = sorted(latency for latency, _ in results)
+        errors = sum(1 for _, status_code in results if status_code >= 300)
+        self.stdout.write(
+            f"{name:<8} {path:<5} {len(latencies) / elapsed:>9.1f} req/s"
+            f"  p50 {statistics.median(latencies) * 1000:>8.2f} ms"
+            f"  p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:>8.2f} ms"
+            f"  {errors} errors"
+        )
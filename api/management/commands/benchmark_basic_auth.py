@@ -0,0 +1,45 @@
+import base64
+
+from django.test.utils import setup_test_environment
+from rest_framework.authentication import BasicAuthentication
+from rest_framework.test import APIRequestFactory
+
+from api.authentication import CachedBasicAuthentication
+from api.management.benchmark import BenchmarkCommand, measure, seed_votes
+from api.models import Employee, User
+from api.utils import UserTypes
+from api.views import MenuViewSet
+
+PASSWORD = "bench-password"
+
+
+class Command(BenchmarkCommand):
+    help = (
+        "Compare the requests per second of menu-list on one core with "
+        "BasicAuthentication and with CachedBasicAuthentication."
+    )
+
+    default_sizes = [10000]
+
+    def seed(self, size):
+        seed_votes(size)
+        user = User(username="bench-basic-auth", user_type=UserTypes.EMPLOYEE)
+        # A real hash, the seeded users have unusable passwords.
+        user.set_password(PASSWORD)
+        user.save()
+        Employee.objects.create(user=user)
+
+    def run_benchmark(self, size, options):
+        setup_test_environment()
+        credentials = base64.b64encode(f"bench-basic-auth:{PASSWORD}".encode())
+        request = APIRequestFactory().get(
+            "/api/menu/", HTTP_AUTHORIZATION=f"Basic {credentials.decode()}"
+        )
+        for authentication_class in (BasicAuthentication, CachedBasicAuthentication):
+            view = MenuViewSet.as_view(
+                {"get": "list"}, authentication_classes=[authentication_class]
+            )
+            view(request)
+            median_ms, count = measure(lambda: view(request), options["repeat"])
+            self.report(size, authentication_class.__name__, median_ms, count)
+            self.stdout.write(f"{'':>16}{1000 / median_ms:.0f} requests/s per core")
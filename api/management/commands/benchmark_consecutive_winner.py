@@ -0,0 +1,49 @@
+import datetime
+
+from django.db.models import Count
+
+from api.constants import MAX_CONSECUTIVE_WINNINGS
+from api.management.benchmark import BenchmarkCommand, measure
+from api.models import Vote
+
+
+def legacy_consecutive_winner(today):
+    """The per-day loop VoteSerializer.validate used before the window query."""
+    previous_voted_dates = [
+        each_row["date_voted"]
+        for each_row in Vote.objects.values("date_voted").distinct()[
+            : MAX_CONSECUTIVE_WINNINGS + 1
+        ]
+        if each_row["date_voted"] != today
+    ]
+    if len(previous_voted_dates) > 1:
+        previous_winner = set()
+        for each_date in previous_voted_dates:
+            restaurant_id = (
+                Vote.objects.filter(date_voted=each_date)
+                .values("restaurant_id")
+                .annotate(total_votes=Count("restaurant_id"))
+                .order_by("-total_votes")[:1][0]["restaurant_id"]
+            )
+            previous_winner.add(restaurant_id)
+        if len(previous_winner) == 1:
+            return previous_winner.pop()
+    return None
+
+
+class Command(BenchmarkCommand):
+    help = "Compare the consecutive winner window query with the per-day loop."
+
+    def run_benchmark(self, size, options):
+        today = datetime.date.today()
+        median_ms, queries = measure(
+            lambda: legacy_consecutive_winner(today), options["repeat"]
+        )
+        self.report(size, "per-day loop", median_ms, queries)
+        median_ms, queries = measure(
+            lambda: Vote.objects.consecutive_winner(
+                before=today, times=MAX_CONSECUTIVE_WINNINGS
+            ),
+            options["repeat"],
+        )
+        self.report(size, "window query", median_ms, queries)
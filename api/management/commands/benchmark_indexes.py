@@ -0,0 +1,84 @@
+import datetime
+
+from django.db import connection
+from django.db.models import Count, Index
+
+from api.management.benchmark import BATCH_SIZE, BenchmarkCommand, measure
+from api.models import Menu, Restaurant, Vote
+
+# The single column indexes Vote.date_voted and Menu.date_posted had before
+# the composite indexes replaced them.
+PREVIOUS_INDEXES = [
+    (Vote, Index(fields=["date_voted"], name="bench_vote_date_voted")),
+    (Menu, Index(fields=["date_posted"], name="bench_menu_date_posted")),
+]
+
+
+def swap_indexes(drop, create):
+    schema_editor = connection.schema_editor()
+    with connection.cursor() as cursor:
+        for model, index in drop:
+            cursor.execute(str(index.remove_sql(model, schema_editor)))
+        for model, index in create:
+            cursor.execute(str(index.create_sql(model, schema_editor)))
+        cursor.execute("ANALYZE")
+
+
+class Command(BenchmarkCommand):
+    help = (
+        "Print query plans and timings of the hot Vote and Menu queries with the "
+        "previous single column indexes and with the composite indexes."
+    )
+
+    def run_benchmark(self, size, options):
+        day = Vote.objects.earliest("date_voted").date_voted
+        restaurant = Restaurant.objects.filter(menu__isnull=False).first()
+        self.seed_menus(day)
+        employee_id = Vote.objects.filter(date_voted=day).first().employee_id
+        queries = {
+            "daily ranking": lambda: Vote.objects.filter(date_voted=day)
+            .values("restaurant_id")
+            .annotate(total_votes=Count("restaurant_id"))
+            .order_by("-total_votes"),
+            "duplicate vote check": lambda: Vote.objects.filter(
+                employee_id=employee_id, date_voted=day
+            ),
+            "vote list page": lambda: Vote.objects.filter(date_voted=day)[:50],
+            "restaurant menus of a day": lambda: Menu.objects.filter(
+                date_posted=day, restaurant=restaurant
+            ),
+        }
+        current_indexes = [(Vote, index) for index in Vote._meta.indexes] + [
+            (Menu, index) for index in Menu._meta.indexes
+        ]
+
+        swap_indexes(drop=current_indexes, create=PREVIOUS_INDEXES)
+        self.run_queries(size, "before", queries, options["repeat"])
+        swap_indexes(drop=PREVIOUS_INDEXES, create=current_indexes)
+        self.run_queries(size, "after", queries, options["repeat"])
+
+    def seed_menus(self, first_day):
+        """One menu per restaurant for every seeded day, so menu lookups by
+        date have history to skip."""
+        restaurants = list(Restaurant.objects.filter(menu__isnull=False))
+        days = (datetime.date.today() - first_day).days
+        Menu.objects.bulk_create(
+            [
+                Menu(
+                    restaurant=restaurant,
+                    title="Bench menu",
+                    description="",
+                    date_posted=first_day + datetime.timedelta(offset),
+                )
+                for offset in range(days)
+                for restaurant in restaurants
+            ],
+            batch_size=BATCH_SIZE,
+        )
+
+    def run_queries(self, size, phase, queries, repeat):
+        for name, query in queries.items():
+            median_ms, count = measure(lambda: list(query()), repeat)
+            self.report(size, f"{name} ({phase})", median_ms, count)
+            for line in query().explain().splitlines():
+                self.stdout.write(f"{'':>16}{line}")
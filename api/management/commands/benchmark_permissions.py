@@ -0,0 +1,90 @@
+from types import SimpleNamespace
+
+from django.urls import reverse
+from rest_framework.test import APIRequestFactory
+
+from api.management.benchmark import BenchmarkCommand, measure
+from api.models import Employee, User, Vote
+from api.permissions import EmployeeViewSetPermission, IsEmployeeUserOrAdmin
+
+
+# The object checks as they were before, matching request.path against the
+# reversed detail URL and comparing the related user rows.
+def previous_vote_check(request, view, obj):
+    if request.path == reverse("vote-detail", kwargs={"pk": obj.pk}):
+        return obj.employee.user == request.user or request.user.is_staff
+    return request.user.is_staff
+
+
+def previous_employee_check(request, view, obj):
+    if request.path == reverse("employee-detail", kwargs={"pk": obj.pk}):
+        return obj.user == request.user or request.user.is_staff
+    return request.user.is_staff
+
+
+class Command(BenchmarkCommand):
+    help = (
+        "Compare the object permission checks of the vote and employee detail "
+        "endpoints before and after dropping reverse() and related row loads."
+    )
+
+    default_sizes = [10000]
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--rows",
+            type=int,
+            default=1000,
+            help="Objects checked per call.",
+        )
+
+    def run_benchmark(self, size, options):
+        rows = options["rows"]
+        user = User.objects.filter(employee_profile__isnull=False).first()
+        view = SimpleNamespace(action="retrieve")
+        cases = [
+            (
+                "vote",
+                Vote.objects.all(),
+                Vote.objects.select_related("employee"),
+                previous_vote_check,
+                IsEmployeeUserOrAdmin(),
+                "vote-detail",
+            ),
+            (
+                "employee",
+                Employee.objects.all(),
+                Employee.objects.all(),
+                previous_employee_check,
+                EmployeeViewSetPermission(),
+                "employee-detail",
+            ),
+        ]
+        for name, before, after, previous_check, permission, url_name in cases:
+            # The objects are fetched anew in every call, no related row is cached.
+            requests = {
+                obj.pk: self.request(user, reverse(url_name, kwargs={"pk": obj.pk}))
+                for obj in before[:rows]
+            }
+            median_ms, count = measure(
+                lambda: [
+                    previous_check(requests[obj.pk], view, obj) for obj in before[:rows]
+                ],
+                options["repeat"],
+            )
+            self.report(size, f"{name} (before)", median_ms, count)
+            median_ms, count = measure(
+                lambda: [
+                    permission.has_object_permission(requests[obj.pk], view, obj)
+                    for obj in after[:rows]
+                ],
+                options["repeat"],
+            )
+            self.report(size, f"{name} (after)", median_ms, count)
+            self.stdout.write(f"{'':>16}{len(requests)} objects checked per call")
+
+    def request(self, user, path):
+        request = APIRequestFactory().get(path)
+        request.user = user
+        return request
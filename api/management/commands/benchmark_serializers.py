@@ -0,0 +1,66 @@
+from api.management.benchmark import BenchmarkCommand, measure, seed_votes
+from api.models import Employee, Menu, Restaurant, Vote
+from api.serializers import (EmployeeProfileSerializer,
+                             EmployeeValuesSerializer, MenuSerializer,
+                             MenuValuesSerializer, RestaurantProfileSerializer,
+                             RestaurantValuesSerializer, VoteSerializer,
+                             VoteValuesSerializer)
+
+
+class Command(BenchmarkCommand):
+    help = (
+        "Compare the rows per second of the list serializers with the values() "
+        "based ones, fetching included."
+    )
+
+    default_sizes = [10000, 100000]
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--rows",
+            type=int,
+            default=5000,
+            help="Rows serialized per call, at most the seeded rows.",
+        )
+
+    def seed(self, size):
+        seed_votes(size, employees=2000, restaurants=200)
+
+    def run_benchmark(self, size, options):
+        cases = [
+            (
+                "employee",
+                Employee.objects.select_related("user"),
+                EmployeeProfileSerializer,
+                EmployeeValuesSerializer,
+            ),
+            (
+                "restaurant",
+                Restaurant.objects.select_related("user"),
+                RestaurantProfileSerializer,
+                RestaurantValuesSerializer,
+            ),
+            ("menu", Menu.objects.all(), MenuSerializer, MenuValuesSerializer),
+            ("vote", Vote.objects.all(), VoteSerializer, VoteValuesSerializer),
+        ]
+        for name, queryset, serializer_class, values_serializer_class in cases:
+            queryset = queryset[: options["rows"]]
+            rows = queryset.count()
+            median_ms, _ = measure(
+                lambda: serializer_class(queryset, many=True).data, options["repeat"]
+            )
+            self.report_rows(size, f"{name} ModelSerializer", rows, median_ms)
+            median_ms, _ = measure(
+                lambda: values_serializer_class(
+                    queryset.values(*values_serializer_class.lookups)
+                ).data,
+                options["repeat"],
+            )
+            self.report_rows(size, f"{name} ValuesSerializer", rows, median_ms)
+
+    def report_rows(self, size, name, rows, median_ms):
+        self.stdout.write(
+            f"{size:>10} votes  {name:<30} {rows:>6} rows"
+            f" {rows / median_ms * 1000:>12.0f} rows/s"
+        )
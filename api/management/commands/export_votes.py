@@ -0,0 +1,50 @@
+import datetime
+
+from django.core.management import BaseCommand
+
+from api.export import EXPORT_FORMATS, export_chunks
+from api.models import Vote
+
+
+class Command(BaseCommand):
+    """Django command to stream the vote history to a file or stdout"""
+
+    help = "Export votes with restaurant and menu names as CSV or NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--format",
+            dest="export_format",
+            choices=list(EXPORT_FORMATS),
+            default="csv",
+        )
+        parser.add_argument(
+            "--output",
+            help="File to write to, defaults to stdout.",
+        )
+        parser.add_argument(
+            "--from",
+            dest="date_from",
+            type=datetime.date.fromisoformat,
+            help="First day to export (YYYY-MM-DD).",
+        )
+        parser.add_argument(
+            "--to",
+            dest="date_to",
+            type=datetime.date.fromisoformat,
+            help="Last day to export (YYYY-MM-DD).",
+        )
+
+    def handle(self, *args, **options):
+        queryset = Vote.objects.all()
+        if options["date_from"]:
+            queryset = queryset.filter(date_voted__gte=options["date_from"])
+        if options["date_to"]:
+            queryset = queryset.filter(date_voted__lte=options["date_to"])
+        chunks = export_chunks(options["export_format"], queryset)
+        if options["output"]:
+            with open(options["output"], "w", newline="") as output:
+                output.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
@@ -0,0 +1,50 @@
+import time
+
+from django.core.management import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from api.onboarding import IMPORT_FORMATS, read_rows
+from api.serializers import EmployeeImportSerializer
+
+
+class Command(BaseCommand):
+    """Django command to create employees in bulk from a file"""
+
+    help = (
+        "Import employees from a CSV file or a JSON list with username, email, "
+        "password and optionally first_name, last_name and department. Nothing "
+        "is imported if any row is invalid."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import.")
+        parser.add_argument(
+            "--format",
+            dest="import_format",
+            choices=IMPORT_FORMATS,
+            default="csv",
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        with open(options["path"], newline="", encoding="utf-8-sig") as file:
+            rows = read_rows(options["import_format"], file)
+        serializer = EmployeeImportSerializer(data=rows, many=True)
+        if not serializer.is_valid():
+            errors = serializer.errors
+            if isinstance(errors, dict):
+                raise CommandError(errors)
+            lines = [
+                f"Row {index + 1}: {row_errors}"
+                for index, row_errors in enumerate(errors)
+                if row_errors
+            ]
+            raise CommandError("\n".join(lines))
+        try:
+            employees = serializer.save()
+        except ValidationError as exc:
+            raise CommandError(exc.detail)
+        self.stdout.write(
+            f"Imported {len(employees)} employees in "
+            f"{time.perf_counter() - start:.1f} s"
+        )
@@ -0,0 +1,77 @@
+import datetime
+import logging
+
+from django.core.management import BaseCommand
+from django.db import connection, transaction
+
+from api.partitions import (add_months, create_partition, detach_partition,
+                            is_partitioned, list_partitions, month_start,
+                            partition_name)
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """Django command to maintain the monthly partitions of the Vote table"""
+
+    help = (
+        "Create the Vote partitions of the coming months and detach (or "
+        "archive) the ones older than the retention period. PostgreSQL only."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--ahead",
+            type=int,
+            default=3,
+            help="Number of future months to have partitions for.",
+        )
+        parser.add_argument(
+            "--retain-months",
+            type=int,
+            help="Detach partitions ending more than this many months ago.",
+        )
+        parser.add_argument(
+            "--archive",
+            action="store_true",
+            help="Move detached partitions to the vote_archive schema.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only print what would be done.",
+        )
+
+    def handle(self, *args, **options):
+        if not is_partitioned(connection):
+            self.stdout.write("The vote table is not partitioned, nothing to do.")
+            return
+        this_month = month_start(datetime.date.today())
+        with transaction.atomic():
+            partitions = list_partitions(connection)
+            covered = {start for _, start, _ in partitions}
+            for offset in range(options["ahead"] + 1):
+                month = add_months(this_month, offset)
+                if month in covered:
+                    continue
+                moved = 0
+                if not options["dry_run"]:
+                    moved = create_partition(connection, month)
+                self.log(f"Created partition {partition_name(month)}")
+                if moved:
+                    self.log(f"Moved {moved} votes there from the default partition")
+
+            if options["retain_months"] is None:
+                return
+            cutoff = add_months(this_month, -options["retain_months"])
+            for name, _, end in partitions:
+                if end > cutoff:
+                    continue
+                if not options["dry_run"]:
+                    detach_partition(connection, name, archive=options["archive"])
+                action = "Archived" if options["archive"] else "Detached"
+                self.log(f"{action} partition {name}")
+
+    def log(self, message):
+        logger.info(message)
+        self.stdout.write(message)
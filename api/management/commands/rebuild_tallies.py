@@ -0,0 +1,37 @@
+import datetime
+import logging
+
+from django.core.management import BaseCommand
+
+from api.cache import winner_cache
+from api.models import RestaurantDailyTally
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """Django command to rebuild the daily restaurant tallies from votes"""
+
+    help = "Rebuild RestaurantDailyTally rows from the raw Vote table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--from",
+            dest="date_from",
+            type=datetime.date.fromisoformat,
+            help="First day to rebuild (YYYY-MM-DD), defaults to the oldest vote.",
+        )
+        parser.add_argument(
+            "--to",
+            dest="date_to",
+            type=datetime.date.fromisoformat,
+            help="Last day to rebuild (YYYY-MM-DD), defaults to the newest vote.",
+        )
+
+    def handle(self, *args, **options):
+        total = RestaurantDailyTally.objects.rebuild(
+            date_from=options["date_from"], date_to=options["date_to"]
+        )
+        winner_cache.invalidate()
+        logger.info(f"Rebuilt {total} restaurant daily tallies")
+        self.stdout.write(f"Rebuilt {total} restaurant daily tallies.")
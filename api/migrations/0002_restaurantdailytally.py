@@ -0,0 +1,75 @@
+# Generated by Django 3.2.3 on 2026-10-18 12:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_tallies(apps, schema_editor):
+    Vote = apps.get_model("api", "Vote")
+    RestaurantDailyTally = apps.get_model("api", "RestaurantDailyTally")
+    db_alias = schema_editor.connection.alias
+    RestaurantDailyTally.objects.using(db_alias).bulk_create(
+        [
+            RestaurantDailyTally(
+                restaurant_id=row["restaurant_id"],
+                date=row["date_voted"],
+                vote_count=row["vote_count"],
+            )
+            for row in Vote.objects.using(db_alias)
+            .values("restaurant_id", "date_voted")
+            .annotate(vote_count=Count("id"))
+            .order_by()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RestaurantDailyTally",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("vote_count", models.PositiveIntegerField(default=0)),
+                (
+                    "restaurant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_tallies",
+                        to="api.restaurant",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-date", "-vote_count"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="restaurantdailytally",
+            index=models.Index(
+                fields=["date", "-vote_count"], name="api_restaur_date_fadd41_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="restaurantdailytally",
+            constraint=models.UniqueConstraint(
+                fields=("restaurant", "date"), name="unique_restaurant_daily_tally"
+            ),
+        ),
+        migrations.RunPython(populate_tallies, migrations.RunPython.noop),
+    ]
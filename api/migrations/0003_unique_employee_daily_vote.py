@@ -0,0 +1,59 @@
+# Generated by Django 3.2.3 on 2026-10-18 12:49
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_votes(apps, schema_editor):
+    """Keep the first vote of every employee per day and recount the
+    tallies of the days that had duplicates."""
+    Vote = apps.get_model("api", "Vote")
+    RestaurantDailyTally = apps.get_model("api", "RestaurantDailyTally")
+    db_alias = schema_editor.connection.alias
+    votes = Vote.objects.using(db_alias)
+    duplicates = (
+        votes.values("employee_id", "date_voted")
+        .annotate(total=Count("id"), first_id=Min("id"))
+        .filter(total__gt=1)
+        .order_by()
+    )
+    dates = set()
+    for row in duplicates:
+        votes.filter(
+            employee_id=row["employee_id"], date_voted=row["date_voted"]
+        ).exclude(id=row["first_id"]).delete()
+        dates.add(row["date_voted"])
+    if not dates:
+        return
+    RestaurantDailyTally.objects.using(db_alias).filter(date__in=dates).delete()
+    RestaurantDailyTally.objects.using(db_alias).bulk_create(
+        [
+            RestaurantDailyTally(
+                restaurant_id=row["restaurant_id"],
+                date=row["date_voted"],
+                vote_count=row["vote_count"],
+            )
+            for row in votes.filter(date_voted__in=dates)
+            .values("restaurant_id", "date_voted")
+            .annotate(vote_count=Count("id"))
+            .order_by()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0002_restaurantdailytally"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_votes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="vote",
+            constraint=models.UniqueConstraint(
+                fields=("employee", "date_voted"), name="unique_employee_daily_vote"
+            ),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.2.3 on 2026-10-18 13:02
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0003_unique_employee_daily_vote"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="menu",
+            options={"ordering": ["date_posted", "restaurant_id", "id"]},
+        ),
+        migrations.AlterModelOptions(
+            name="vote",
+            options={"ordering": ["-date_voted", "-id"]},
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 3.2.3 on 2026-10-18 13:04
+
+import datetime
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0004_keyset_ordering"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="menu",
+            index=models.Index(
+                fields=["date_posted", "restaurant", "id"],
+                name="menu_date_restaurant_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="vote",
+            index=models.Index(
+                fields=["date_voted", "restaurant"], name="vote_date_restaurant_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="vote",
+            index=models.Index(fields=["date_voted", "id"], name="vote_date_id_idx"),
+        ),
+        migrations.AlterField(
+            model_name="menu",
+            name="date_posted",
+            field=models.DateField(default=datetime.date.today, editable=False),
+        ),
+        migrations.AlterField(
+            model_name="vote",
+            name="date_voted",
+            field=models.DateField(default=datetime.date.today, editable=False),
+        ),
+    ]
@@ -0,0 +1,121 @@
+import datetime
+
+from django.db import migrations
+
+TABLE = "api_vote"
+MONTHS_AHEAD = 3
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def table_definition(cursor, table):
+    """Constraints and indexes of ``table`` read from the catalog, as
+    ``(name, type, definition)`` and ``(name, definition)`` lists."""
+    cursor.execute(
+        """
+        SELECT conname, contype, pg_get_constraintdef(oid)
+        FROM pg_constraint
+        WHERE conrelid = to_regclass(%s)
+        """,
+        [table],
+    )
+    constraints = cursor.fetchall()
+    cursor.execute(
+        """
+        SELECT idx.relname, pg_get_indexdef(idx.oid)
+        FROM pg_index
+        JOIN pg_class idx ON idx.oid = pg_index.indexrelid
+        WHERE pg_index.indrelid = to_regclass(%s)
+          AND NOT EXISTS (
+              SELECT 1 FROM pg_constraint WHERE pg_constraint.conindid = idx.oid
+          )
+        """,
+        [table],
+    )
+    return constraints, cursor.fetchall()
+
+
+def rebuild_table(schema_editor, partitioned):
+    """Copy ``api_vote`` into a new table, partitioned by month of
+    ``date_voted`` or plain, and give it the same constraints and indexes.
+
+    A partitioned table's primary key has to contain the partition key, so
+    it becomes (id, date_voted) there. Ids still come from the same
+    sequence and stay unique.
+    """
+    quote = schema_editor.quote_name
+    old = f"{TABLE}_old"
+    with schema_editor.connection.cursor() as cursor:
+        constraints, indexes = table_definition(cursor, TABLE)
+        cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [TABLE])
+        (sequence,) = cursor.fetchone()
+
+        cursor.execute(f"ALTER TABLE {quote(TABLE)} RENAME TO {quote(old)}")
+        # Free the names for the new table, the old one is dropped below.
+        for name, _ in indexes:
+            cursor.execute(f"DROP INDEX {quote(name)}")
+        for name, _, _ in constraints:
+            cursor.execute(f"ALTER TABLE {quote(old)} DROP CONSTRAINT {quote(name)}")
+
+        partition_by = " PARTITION BY RANGE (date_voted)" if partitioned else ""
+        cursor.execute(
+            f"CREATE TABLE {quote(TABLE)} "
+            f"(LIKE {quote(old)} INCLUDING DEFAULTS){partition_by}"
+        )
+        if sequence:
+            cursor.execute(f"ALTER SEQUENCE {sequence} OWNED BY {quote(TABLE)}.id")
+        if partitioned:
+            cursor.execute(f"SELECT MIN(date_voted) FROM {quote(old)}")
+            (first_day,) = cursor.fetchone()
+            this_month = datetime.date.today().replace(day=1)
+            month = min(first_day or this_month, this_month).replace(day=1)
+            while month <= add_months(this_month, MONTHS_AHEAD):
+                cursor.execute(
+                    f"CREATE TABLE {quote(f'{TABLE}_p{month:%Y%m}')} "
+                    f"PARTITION OF {quote(TABLE)} FOR VALUES FROM (%s) TO (%s)",
+                    [month.isoformat(), add_months(month, 1).isoformat()],
+                )
+                month = add_months(month, 1)
+            cursor.execute(
+                f"CREATE TABLE {quote(f'{TABLE}_default')} "
+                f"PARTITION OF {quote(TABLE)} DEFAULT"
+            )
+
+        cursor.execute(f"INSERT INTO {quote(TABLE)} SELECT * FROM {quote(old)}")
+        cursor.execute(f"DROP TABLE {quote(old)}")
+
+        for name, kind, definition in constraints:
+            if kind == "p":
+                key = "id, date_voted" if partitioned else "id"
+                definition = f"PRIMARY KEY ({key})"
+            cursor.execute(
+                f"ALTER TABLE {quote(TABLE)} ADD CONSTRAINT {quote(name)} {definition}"
+            )
+        for _, definition in indexes:
+            cursor.execute(definition)
+
+
+def partition_votes(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        rebuild_table(schema_editor, partitioned=True)
+
+
+def unpartition_votes(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        rebuild_table(schema_editor, partitioned=False)
+
+
+class Migration(migrations.Migration):
+    """Partition the Vote table by month of date_voted on PostgreSQL, other
+    databases keep the plain table. See api.partitions."""
+
+    dependencies = [
+        ("api", "0005_composite_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_votes, unpartition_votes),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.2.3 on 2026-10-18 13:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0006_partition_votes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TableVersion",
+            fields=[
+                (
+                    "label",
+                    models.CharField(max_length=100, primary_key=True, serialize=False),
+                ),
+                ("token", models.CharField(max_length=32)),
+                ("modified", models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -1,8 +1,11 @@
 import datetime
+from collections import Counter
 
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.validators import UnicodeUsernameValidator
-from django.db import models
+from django.db import connections, models, router, transaction
+from django.db.models import Count, F
+from django.dispatch import Signal
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
@@ -80,7 +83,6 @@ class Menu(models.Model):
 
     date_posted = models.DateField(
         default=datetime.date.today,
-        db_index=True,
         editable=False,
     )
 
@@ -88,7 +90,98 @@ class Menu(models.Model):
         return self.title
 
     class Meta:
-        ordering = ["date_posted", "restaurant"]
+        # By restaurant_id, "restaurant" would follow Restaurant.Meta.ordering.
+        ordering = ["date_posted", "restaurant_id", "id"]
+        indexes = [
+            # Menus of a day, optionally of one restaurant, in list order.
+            models.Index(
+                fields=["date_posted", "restaurant", "id"],
+                name="menu_date_restaurant_idx",
+            ),
+        ]
+
+
+class VoteQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        """Insert votes and add them to the daily tallies in one transaction."""
+        if kwargs.get("ignore_conflicts"):
+            raise ValueError("Votes can not be bulk created with ignore_conflicts.")
+        objs = list(objs)
+        counts = Counter((vote.restaurant_id, vote.date_voted) for vote in objs)
+        tallies = RestaurantDailyTally.objects.using(self.db)
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            for (restaurant_id, date), count in counts.items():
+                tallies.add_votes(restaurant_id, date, count)
+        if objs and objs[0].pk is None:
+            # The backend can not return ids from a bulk insert (SQLite), look
+            # them up by the unique (employee, date_voted) pair instead.
+            pks = {
+                (employee_id, date_voted): pk
+                for employee_id, date_voted, pk in self.filter(
+                    employee__in={vote.employee_id for vote in objs},
+                    date_voted__in={vote.date_voted for vote in objs},
+                ).values_list("employee_id", "date_voted", "pk")
+            }
+            for vote in objs:
+                vote.pk = pks[vote.employee_id, vote.date_voted]
+                vote._state.adding = False
+                vote._state.db = self.db
+        return objs
+
+    def consecutive_winner(self, before, times):
+        """Return the restaurant id that won each of the last ``times`` voting
+        days before ``before``, or ``None`` if the winner changed in between.
+
+        Per-day winners are ranked with a window function and the latest run of
+        equal winners is found with the gaps-and-islands trick, so the whole
+        check is a single query on both PostgreSQL and SQLite.
+        """
+        connection = connections[self.db]
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        before = connection.ops.adapt_datefield_value(before)
+        sql = f"""
+            WITH daily AS (
+                SELECT date_voted, restaurant_id, COUNT(*) AS total_votes
+                FROM {table}
+                WHERE date_voted < %s
+                  AND date_voted >= (
+                      SELECT MIN(date_voted) FROM (
+                          SELECT DISTINCT date_voted FROM {table}
+                          WHERE date_voted < %s
+                          ORDER BY date_voted DESC
+                          LIMIT %s
+                      ) last_days
+                  )
+                GROUP BY date_voted, restaurant_id
+            ),
+            winners AS (
+                SELECT date_voted, restaurant_id,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY date_voted
+                           ORDER BY total_votes DESC, restaurant_id
+                       ) AS place
+                FROM daily
+            ),
+            islands AS (
+                SELECT restaurant_id,
+                       ROW_NUMBER() OVER (ORDER BY date_voted DESC)
+                       - ROW_NUMBER() OVER (
+                           PARTITION BY restaurant_id ORDER BY date_voted DESC
+                       ) AS island
+                FROM winners
+                WHERE place = 1
+            )
+            SELECT restaurant_id
+            FROM islands
+            WHERE island = 0
+            GROUP BY restaurant_id
+            HAVING COUNT(*) >= %s
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [before, before, times, times])
+            row = cursor.fetchone()
+        return row[0] if row else None
 
 
 class Vote(models.Model):
@@ -106,9 +199,200 @@ class Vote(models.Model):
 
     date_voted = models.DateField(
         default=datetime.date.today,
-        db_index=True,
         editable=False,
     )
 
+    objects = VoteQuerySet.as_manager()
+
+    class Meta:
+        ordering = ["-date_voted", "-id"]
+        indexes = [
+            # Votes of a day grouped by restaurant, answered from the index.
+            # Lookups by employee and day use the unique constraint's index.
+            models.Index(
+                fields=["date_voted", "restaurant"], name="vote_date_restaurant_idx"
+            ),
+            # Pages of vote-list, walked backwards for the descending ordering.
+            models.Index(fields=["date_voted", "id"], name="vote_date_id_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["employee", "date_voted"], name="unique_employee_daily_vote"
+            )
+        ]
+
+    @staticmethod
+    def is_duplicate_error(exc):
+        """Whether the ``IntegrityError`` ``exc`` comes from the one vote per
+        employee and day constraint, rather than a foreign key or another
+        constraint."""
+        diag = getattr(exc.__cause__, "diag", None)
+        if diag is not None:
+            # psycopg2. On a partitioned table the violated index is the
+            # partition's own one, recognised by its key columns.
+            return diag.constraint_name == "unique_employee_daily_vote" or (
+                diag.message_detail or ""
+            ).startswith("Key (employee_id, date_voted)=")
+        # SQLite names the columns instead of the constraint.
+        table = Vote._meta.db_table
+        return f"{table}.employee_id, {table}.date_voted" in str(exc)
+
+    def save(self, *args, **kwargs):
+        """Save the vote and move it between daily tallies in one transaction."""
+        using = kwargs.get("using") or router.db_for_write(Vote, instance=self)
+        tallies = RestaurantDailyTally.objects.using(using)
+        with transaction.atomic(using=using):
+            if not self._state.adding:
+                previous = (
+                    Vote.objects.using(using)
+                    .filter(pk=self.pk)
+                    .values_list("restaurant_id", "date_voted")
+                    .first()
+                )
+                if previous:
+                    tallies.add_votes(*previous, -1)
+            super().save(*args, **kwargs)
+            tallies.add_votes(self.restaurant_id, self.date_voted, 1)
+
+
+# Sent with restaurant_id, date, count and using whenever votes are added to
+# or removed from a tally, before the surrounding transaction commits.
+tally_changed = Signal()
+
+
+class RestaurantDailyTallyQuerySet(models.QuerySet):
+    def add_votes(self, restaurant_id, date, count):
+        """Atomically add ``count`` (possibly negative) votes to a tally."""
+        tally_changed.send(
+            sender=RestaurantDailyTally,
+            restaurant_id=restaurant_id,
+            date=date,
+            count=count,
+            using=self.db,
+        )
+        tallies = self.filter(restaurant_id=restaurant_id, date=date)
+        if tallies.update(vote_count=F("vote_count") + count) or count < 0:
+            return
+        _, created = self.get_or_create(
+            restaurant_id=restaurant_id, date=date, defaults={"vote_count": count}
+        )
+        if not created:
+            tallies.update(vote_count=F("vote_count") + count)
+
+    def rebuild(self, date_from=None, date_to=None):
+        """Replace the tallies between ``date_from`` and ``date_to`` (both
+        optional and inclusive) with counts aggregated from ``Vote`` rows.
+        Returns the number of tallies written."""
+        votes = Vote.objects.using(self.db)
+        tallies = self
+        if date_from:
+            votes = votes.filter(date_voted__gte=date_from)
+            tallies = tallies.filter(date__gte=date_from)
+        if date_to:
+            votes = votes.filter(date_voted__lte=date_to)
+            tallies = tallies.filter(date__lte=date_to)
+        counts = (
+            votes.values("restaurant_id", "date_voted")
+            .annotate(vote_count=Count("id"))
+            .order_by()
+        )
+        with transaction.atomic(using=self.db):
+            tallies.delete()
+            created = self.bulk_create(
+                [
+                    self.model(
+                        restaurant_id=row["restaurant_id"],
+                        date=row["date_voted"],
+                        vote_count=row["vote_count"],
+                    )
+                    for row in counts
+                ],
+                batch_size=1000,
+            )
+        return len(created)
+
+    def ranking(self, date):
+        return (
+            self.filter(date=date, vote_count__gt=0)
+            .values("restaurant_id", total_votes=F("vote_count"))
+            .order_by("-vote_count", "restaurant_id")
+        )
+
+    def winners(self, date_from, date_to):
+        """Return the winner of every day between ``date_from`` and ``date_to``
+        (inclusive) that has votes, oldest first, as dicts with ``date``,
+        ``restaurant_id`` and ``total_votes``.
+
+        The days are ranked with a window function in a single query, ties go
+        to the lowest restaurant id like in ``ranking``.
+        """
+        ops = connections[self.db].ops
+        table = ops.quote_name(self.model._meta.db_table)
+        sql = f"""
+            SELECT id, date, restaurant_id, vote_count
+            FROM (
+                SELECT id, date, restaurant_id, vote_count,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY date
+                           ORDER BY vote_count DESC, restaurant_id
+                       ) AS place
+                FROM {table}
+                WHERE date >= %s AND date <= %s AND vote_count > 0
+            ) ranked
+            WHERE place = 1
+            ORDER BY date
+        """
+        return [
+            {
+                "date": tally.date,
+                "restaurant_id": tally.restaurant_id,
+                "total_votes": tally.vote_count,
+            }
+            for tally in self.raw(
+                sql,
+                [
+                    ops.adapt_datefield_value(date_from),
+                    ops.adapt_datefield_value(date_to),
+                ],
+            )
+        ]
+
+
+class RestaurantDailyTally(models.Model):
+    """Number of votes a restaurant received on a day, kept in step with
+    ``Vote`` so the winner can be read without aggregating votes."""
+
+    restaurant = models.ForeignKey(
+        Restaurant,
+        on_delete=models.CASCADE,
+        related_name="daily_tallies",
+    )
+    date = models.DateField()
+    vote_count = models.PositiveIntegerField(default=0)
+
+    objects = RestaurantDailyTallyQuerySet.as_manager()
+
     class Meta:
-        ordering = ["-date_voted"]
+        ordering = ["-date", "-vote_count"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["restaurant", "date"], name="unique_restaurant_daily_tally"
+            )
+        ]
+        indexes = [models.Index(fields=["date", "-vote_count"])]
+
+    def __str__(self):
+        return f"{self.restaurant_id} on {self.date}: {self.vote_count}"
+
+
+class TableVersion(models.Model):
+    """Version of a table's rows, replaced in the transaction of every save
+    or delete. Validators and response snapshots are derived from it, see
+    ``api.cache.TableVersions``."""
+
+    label = models.CharField(max_length=100, primary_key=True)
+    token = models.CharField(max_length=32)
+    modified = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.label} {self.token}"
@@ -0,0 +1,57 @@
+"""Bulk import of employees from CSV or JSON.
+
+Creating employees one by one through employee-list costs an email
+uniqueness query, a PBKDF2 hash and two INSERTs each. The import validates
+uniqueness of all rows with a few ``__in`` queries, hashes the passwords
+on a process pool of ``EMPLOYEE_IMPORT_WORKERS`` processes and inserts
+the ``User`` and ``Employee`` rows with ``bulk_create`` in batches of
+``BATCH_SIZE``. See ``EmployeeImportSerializer``.
+
+The ``import_employees`` command takes up to ``MAX_EMPLOYEE_IMPORT_SIZE``
+rows. The employee-import endpoint takes ``MAX_EMPLOYEE_IMPORT_REQUEST_SIZE``
+and hashes in the web worker's own process, every password costing tens
+of milliseconds of the request.
+"""
+import csv
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+
+BATCH_SIZE = 1000
+
+IMPORT_FORMATS = ("csv", "json")
+
+
+def read_rows(import_format, file):
+    """Return the rows of an import file, a binary or text file object, as a
+    list of dicts."""
+    if isinstance(file.read(0), bytes):
+        file = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    if import_format == "csv":
+        return list(csv.DictReader(file))
+    return json.load(file)
+
+
+def _init_worker():
+    # Spawned workers (macOS, Windows) start without configured settings.
+    django.setup()
+
+
+def hash_passwords(passwords, workers=None):
+    """Return ``make_password`` of every password, computed on ``workers``
+    processes, by default ``EMPLOYEE_IMPORT_WORKERS`` (all cores when
+    ``None``, in this process when 0)."""
+    if workers is None:
+        workers = settings.EMPLOYEE_IMPORT_WORKERS
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers == 0 or len(passwords) < 2:
+        return [make_password(password) for password in passwords]
+    chunksize = max(1, len(passwords) // (workers * 4))
+    with ProcessPoolExecutor(workers, initializer=_init_worker) as executor:
+        return list(executor.map(make_password, passwords, chunksize=chunksize))
@@ -0,0 +1,171 @@
+import base64
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination on the full ``Meta.ordering`` of the model.
+
+    The cursor holds the ordering values of the last (or first) row of the
+    page and the next page is fetched with a ``WHERE`` on those values, so
+    every page costs the same index range scan whatever its position and no
+    ``COUNT(*)`` is run. The ordering must end with a unique field.
+    """
+
+    cursor_query_param = "cursor"
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = "limit"
+    max_page_size = 1000
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset, view)
+        self.fields = [
+            queryset.model._meta.get_field(name.lstrip("-")) for name in self.ordering
+        ]
+        position, reverse = self.decode_cursor(request)
+
+        ordering = self.ordering
+        if reverse:
+            ordering = [self.invert(name) for name in ordering]
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.after(ordering, position))
+        page = list(queryset[: self.page_size + 1])
+        has_more = len(page) > self.page_size
+        page = page[: self.page_size]
+        if reverse:
+            page.reverse()
+
+        self.next_position = self.previous_position = None
+        if page:
+            if has_more or reverse:
+                self.next_position = self.position(page[-1])
+            if position is not None and (has_more or not reverse):
+                self.previous_position = self.position(page[0])
+        return page
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True},
+                "previous": {"type": "string", "nullable": True},
+                "results": schema,
+            },
+        }
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position, reverse=False)
+
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return self.encode_cursor(self.previous_position, reverse=True)
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size,
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def get_ordering(self, queryset, view):
+        ordering = getattr(view, "ordering", None) or queryset.model._meta.ordering
+        assert (
+            ordering
+        ), f"KeysetPagination requires an ordering on {queryset.model.__name__}."
+        return list(ordering)
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "The pagination cursor value.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Number of results to return per page.",
+                "schema": {"type": "integer"},
+            },
+        ]
+
+    def after(self, ordering, position):
+        """``Q`` matching the rows that come after ``position`` in ``ordering``."""
+        conditions = []
+        for index, name in enumerate(ordering):
+            lookup = "lt" if name.startswith("-") else "gt"
+            equal = {self.fields[i].attname: position[i] for i in range(index)}
+            conditions.append(
+                Q(
+                    **equal,
+                    **{f"{self.fields[index].attname}__{lookup}": position[index]},
+                )
+            )
+        return reduce(or_, conditions)
+
+    def position(self, instance):
+        """Ordering values of a model instance or a ``values()`` row."""
+        if isinstance(instance, dict):
+            return [str(instance[field.attname]) for field in self.fields]
+        return [field.value_to_string(instance) for field in self.fields]
+
+    def encode_cursor(self, position, reverse):
+        cursor = {"p": position}
+        if reverse:
+            cursor["r"] = 1
+        encoded = base64.urlsafe_b64encode(
+            json.dumps(cursor, separators=(",", ":")).encode()
+        ).decode()
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            values = cursor["p"]
+            if len(values) != len(self.fields):
+                raise ValueError
+            position = [
+                field.to_python(value) for field, value in zip(self.fields, values)
+            ]
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return position, bool(cursor.get("r"))
+
+    @staticmethod
+    def invert(name):
+        return name[1:] if name.startswith("-") else f"-{name}"
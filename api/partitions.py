@@ -0,0 +1,130 @@
+"""Monthly range partitions of the Vote table on PostgreSQL.
+
+Migration 0006 turns ``api_vote`` into a table partitioned by
+``date_voted`` with one partition per month, named ``api_vote_pYYYYMM``,
+and a default partition catching days no partition covers.
+``manage_vote_partitions`` keeps partitions created ahead of time and
+detaches or archives old ones. On other databases ``api_vote`` stays a
+plain table and all of this is skipped.
+"""
+
+import datetime
+import re
+
+from django.db import transaction
+
+from api.models import Vote
+
+ARCHIVE_SCHEMA = "vote_archive"
+
+_BOUND_RE = re.compile(r"FROM \('([\d-]+)'\) TO \('([\d-]+)'\)")
+
+
+def month_start(date):
+    return date.replace(day=1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"{Vote._meta.db_table}_p{month:%Y%m}"
+
+
+def parse_bounds(bound):
+    """Return ``(from, to)`` dates of a range partition bound expression, or
+    ``None`` for the default partition."""
+    match = _BOUND_RE.search(bound)
+    if match is None:
+        return None
+    return tuple(datetime.date.fromisoformat(value) for value in match.groups())
+
+
+def is_partitioned(connection):
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)",
+            [Vote._meta.db_table],
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions(connection):
+    """Return ``(name, from, to)`` of every month partition, oldest first."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+            FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = to_regclass(%s)
+            """,
+            [Vote._meta.db_table],
+        )
+        rows = cursor.fetchall()
+    partitions = []
+    for name, bound in rows:
+        bounds = parse_bounds(bound)
+        if bounds is not None:
+            partitions.append((name, *bounds))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def default_partition_name():
+    return f"{Vote._meta.db_table}_default"
+
+
+def create_partition(connection, month):
+    """Create the partition of ``month`` and return the number of votes
+    moved into it from the default partition.
+
+    PostgreSQL refuses to create a partition for rows the default partition
+    already holds, so the partition is created as a plain table, those
+    votes are moved into it and it is attached, all in one transaction.
+    """
+    quote = connection.ops.quote_name
+    name = partition_name(month)
+    bounds = [month.isoformat(), add_months(month, 1).isoformat()]
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s)", [name])
+        if cursor.fetchone()[0] is not None:
+            return 0
+        cursor.execute(
+            f"CREATE TABLE {quote(name)} "
+            f"(LIKE {quote(Vote._meta.db_table)} INCLUDING DEFAULTS)"
+        )
+        cursor.execute(
+            f"WITH moved AS ("
+            f"DELETE FROM {quote(default_partition_name())} "
+            f"WHERE date_voted >= %s AND date_voted < %s RETURNING *"
+            f") INSERT INTO {quote(name)} SELECT * FROM moved",
+            bounds,
+        )
+        moved = cursor.rowcount
+        # Attaching adds the indexes, unique and foreign key constraints.
+        cursor.execute(
+            f"ALTER TABLE {quote(Vote._meta.db_table)} "
+            f"ATTACH PARTITION {quote(name)} FOR VALUES FROM (%s) TO (%s)",
+            bounds,
+        )
+    return moved
+
+
+def detach_partition(connection, name, archive=False):
+    """Detach a partition from ``api_vote``, it stays a plain table. With
+    ``archive`` it is moved to the ``vote_archive`` schema too."""
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"ALTER TABLE {quote(Vote._meta.db_table)} "
+            f"DETACH PARTITION {quote(name)}"
+        )
+        if archive:
+            cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {quote(ARCHIVE_SCHEMA)}")
+            cursor.execute(
+                f"ALTER TABLE {quote(name)} SET SCHEMA {quote(ARCHIVE_SCHEMA)}"
+            )
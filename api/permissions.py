@@ -1,8 +1,14 @@
-from django.urls import reverse
 from rest_framework import permissions
 
 from api.utils import UserTypes
 
+# Actions of the detail routes, whose object checks are ownership checks.
+DETAIL_ACTIONS = ("retrieve", "update", "partial_update", "destroy")
+
+
+def is_detail_action(view):
+    return getattr(view, "action", None) in DETAIL_ACTIONS
+
 
 class IsEmployeeUserOrAdmin(permissions.BasePermission):
     def has_permission(self, request, view):
@@ -11,8 +17,9 @@ class IsEmployeeUserOrAdmin(permissions.BasePermission):
         return request.user.user_type == UserTypes.EMPLOYEE or request.user.is_staff
 
     def has_object_permission(self, request, view, obj):
-        if request.path == reverse("vote-detail", kwargs={"pk": obj.pk}):
-            return obj.employee.user == request.user or request.user.is_staff
+        # VoteViewSet joins the employee for these, so no query.
+        if is_detail_action(view):
+            return obj.employee.user_id == request.user.pk or request.user.is_staff
         return request.user.is_staff or request.user.user_type == UserTypes.EMPLOYEE
 
 
@@ -35,8 +42,8 @@ class EmployeeViewSetPermission(permissions.BasePermission):
             return request.user and request.user.is_staff
 
     def has_object_permission(self, request, view, obj):
-        if request.path == reverse("employee-detail", kwargs={"pk": obj.pk}):
-            return obj.user == request.user or request.user.is_staff
+        if is_detail_action(view):
+            return obj.user_id == request.user.pk or request.user.is_staff
         return request.user.is_staff or request.user.user_type == UserTypes.EMPLOYEE
 
 
@@ -61,8 +68,8 @@ class RestaurantViewSetPermission(permissions.BasePermission):
             return request.user and request.user.is_authenticated
 
     def has_object_permission(self, request, view, obj):
-        if request.path == reverse("restaurant-detail", kwargs={"pk": obj.pk}):
-            return obj.user == request.user or request.user.is_staff
+        if is_detail_action(view):
+            return obj.user_id == request.user.pk or request.user.is_staff
         return request.user.is_staff or request.user.user_type == UserTypes.RESTAURANT
 
 
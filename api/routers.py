@@ -0,0 +1,113 @@
+"""Database routing of read-only API traffic to replicas.
+
+``ReadReplicaRouter`` sends reads to one of ``DATABASE_REPLICAS`` only
+inside ``use_replica()``, every other read and all writes go to the
+primary (``default``). ``ReplicaReadMixin`` enters it for the list and
+retrieve actions of a viewset, unless the user wrote something in the last
+``READ_YOUR_WRITES["SECONDS"]`` and must see it. That is remembered in the
+``READ_YOUR_WRITES["ALIAS"]`` cache, which must be shared by all workers
+(see ``api.checks``).
+"""
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+
+_read_alias = ContextVar("read_alias", default=None)
+
+
+@contextmanager
+def use_replica():
+    """Route the reads of this block to a replica, the same one for all of
+    them. Without replicas configured this changes nothing."""
+    replicas = settings.DATABASE_REPLICAS
+    token = _read_alias.set(random.choice(replicas) if replicas else None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+@contextmanager
+def use_primary():
+    """Route the reads of this block to the primary, e.g. for a read that
+    must see the latest writes."""
+    token = _read_alias.set(None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def reading_from_replica():
+    """Whether reads are routed to a replica right now."""
+    return _read_alias.get() is not None
+
+
+class ReadReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every database is the primary or a copy of it.
+        databases = settings.DATABASES
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+def _recent_write_key(user):
+    return f"recent-write:{user.pk}"
+
+
+def _marker_cache():
+    return caches[settings.READ_YOUR_WRITES["ALIAS"]]
+
+
+def note_write(user):
+    _marker_cache().set(
+        _recent_write_key(user), True, settings.READ_YOUR_WRITES["SECONDS"]
+    )
+
+
+def wrote_recently(user):
+    return _marker_cache().get(_recent_write_key(user), False)
+
+
+class ReplicaReadMixin:
+    """Serve ``list`` and ``retrieve`` from a replica. Successful writes of
+    an authenticated user pin their reads to the primary for
+    ``READ_YOUR_WRITES["SECONDS"]``."""
+
+    replica_actions = ("list", "retrieve")
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if (
+            settings.DATABASE_REPLICAS
+            and self.action in self.replica_actions
+            and not (request.user.is_authenticated and wrote_recently(request.user))
+        ):
+            self._replica_context = use_replica()
+            self._replica_context.__enter__()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        replica_context = getattr(self, "_replica_context", None)
+        if replica_context is not None:
+            self._replica_context = None
+            replica_context.__exit__(None, None, None)
+        if (
+            settings.DATABASE_REPLICAS
+            and request.method not in ("GET", "HEAD", "OPTIONS")
+            and response.status_code < 400
+            and request.user.is_authenticated
+        ):
+            note_write(request.user)
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -1,15 +1,47 @@
 import datetime
+from operator import itemgetter
 
-from django.db.models import Count
-from django.shortcuts import get_object_or_404
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
-from rest_framework.exceptions import PermissionDenied
-
-from api.constants import MAX_CONSECUTIVE_WINNINGS
+from rest_framework.exceptions import AuthenticationFailed, PermissionDenied
+from rest_framework.settings import api_settings
+from rest_framework_simplejwt.serializers import (TokenObtainPairSerializer,
+                                                  TokenRefreshSerializer)
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from api.authentication import ClaimsRefreshToken, invalidate_credentials
+from api.constants import (MAX_CONSECUTIVE_WINNINGS, MAX_DATE_RANGE_DAYS,
+                           MAX_EMPLOYEE_IMPORT_SIZE, MAX_VOTE_BATCH_SIZE)
+from api.exceptions import Conflict
 from api.models import Employee, Menu, Restaurant, User, Vote
+from api.onboarding import BATCH_SIZE, hash_passwords
 from api.utils import UserTypes
 
 
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        return ClaimsRefreshToken.for_user(user)
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refresh for users that still exist and are active, with their current
+    claims instead of the ones in the refresh token."""
+
+    def validate(self, attrs):
+        refresh = ClaimsRefreshToken(attrs["refresh"])
+        user = User.objects.filter(
+            **{jwt_settings.USER_ID_FIELD: refresh[jwt_settings.USER_ID_CLAIM]}
+        ).first()
+        if user is None:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+        if not user.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        refresh.set_claims(user)
+        return super().validate({"refresh": str(refresh)})
+
+
 class EmployeeUserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -60,6 +92,8 @@ class EmployeeProfileSerializer(serializers.ModelSerializer):
             instance.user.set_password(password)
         instance.user.save()
         instance.save()
+        if password:
+            invalidate_credentials(instance.user)
         return instance
 
     def to_representation(self, obj):
@@ -72,6 +106,99 @@ class EmployeeProfileSerializer(serializers.ModelSerializer):
         return representation
 
 
+class EmployeeImportListSerializer(serializers.ListSerializer):
+    """Validates an employee import with a fixed number of queries per
+    ``BATCH_SIZE`` rows and creates it with ``bulk_create``, all rows or
+    none. The ``max_rows`` and ``hash_workers`` context entries override
+    ``MAX_EMPLOYEE_IMPORT_SIZE`` and ``EMPLOYEE_IMPORT_WORKERS``."""
+
+    def to_internal_value(self, data):
+        max_rows = self.context.get("max_rows", MAX_EMPLOYEE_IMPORT_SIZE)
+        if isinstance(data, list) and len(data) > max_rows:
+            raise serializers.ValidationError(
+                {
+                    api_settings.NON_FIELD_ERRORS_KEY: [
+                        f"At most {max_rows} employees can be imported at once."
+                    ]
+                }
+            )
+        rows = super().to_internal_value(data)
+        taken = {
+            field: self.existing(field, [row[field] for row in rows])
+            for field in ("username", "email")
+        }
+        errors = []
+        for row in rows:
+            row_errors = {}
+            for field, values in taken.items():
+                if row[field] in values:
+                    row_errors[field] = [
+                        f"This {field} is already used by another user."
+                    ]
+                values.add(row[field])
+            errors.append(row_errors)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return rows
+
+    def existing(self, field, values):
+        existing = set()
+        for start in range(0, len(values), BATCH_SIZE):
+            existing.update(
+                User.objects.filter(
+                    **{f"{field}__in": values[start : start + BATCH_SIZE]}
+                ).values_list(field, flat=True)
+            )
+        return existing
+
+    def create(self, validated_data):
+        passwords = hash_passwords(
+            [row["password"] for row in validated_data],
+            workers=self.context.get("hash_workers"),
+        )
+        users = [
+            User(
+                username=row["username"],
+                email=row["email"],
+                first_name=row["first_name"],
+                last_name=row["last_name"],
+                user_type=UserTypes.EMPLOYEE,
+                password=password,
+            )
+            for row, password in zip(validated_data, passwords)
+        ]
+        employees = [
+            Employee(user=user, department=row["department"])
+            for row, user in zip(validated_data, users)
+        ]
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create(users, batch_size=BATCH_SIZE)
+                Employee.objects.bulk_create(employees, batch_size=BATCH_SIZE)
+        except IntegrityError:
+            raise serializers.ValidationError(
+                "A username or email was taken while importing, nothing was"
+                " imported."
+            )
+        return employees
+
+
+class EmployeeImportSerializer(serializers.Serializer):
+    """One row of an employee import, see ``api.onboarding``."""
+
+    username = serializers.CharField(
+        max_length=150, validators=[UnicodeUsernameValidator()]
+    )
+    email = serializers.EmailField()
+    password = serializers.CharField(write_only=True)
+    first_name = serializers.CharField(max_length=150, required=False, default="")
+    last_name = serializers.CharField(max_length=150, required=False, default="")
+    department = serializers.CharField(max_length=150, required=False, default="")
+
+    class Meta:
+        list_serializer_class = EmployeeImportListSerializer
+
+
 class RestaurantUserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -134,6 +261,12 @@ class MenuSerializer(serializers.ModelSerializer):
 
 
 class VoteSerializer(serializers.ModelSerializer):
+
+    restaurant = serializers.IntegerField(source="restaurant_id")
+    menu = serializers.PrimaryKeyRelatedField(
+        queryset=Menu.objects.select_related("restaurant")
+    )
+
     class Meta:
         model = Vote
         fields = (
@@ -146,37 +279,36 @@ class VoteSerializer(serializers.ModelSerializer):
         )
 
     def validate(self, validated_data):
+        """Validate a vote from the employee and menu (joined with its
+        restaurant) loaded by the field lookups, without further queries
+        unless the vote is rejected."""
         request = self.context["request"]
-        restaurant = get_object_or_404(Restaurant, pk=request.data.get("restaurant"))
-        menu = get_object_or_404(Menu, pk=request.data.get("menu"))
-        employee = get_object_or_404(Employee, pk=request.data.get("employee"))
-        if employee.user != request.user:
+        menu = validated_data["menu"]
+        employee = validated_data["employee"]
+        if employee.user_id != request.user.pk:
             raise PermissionDenied()
-        previous_voted_dates = [
-            each_row["date_voted"]
-            for each_row in Vote.objects.values("date_voted").distinct()[
-                : MAX_CONSECUTIVE_WINNINGS + 1
-            ]
-            if each_row["date_voted"] != datetime.date.today()
-        ]
-        if len(previous_voted_dates) > 1:
-            previous_winner = set()
-            for each_date in previous_voted_dates:
-                restaurant_id = (
-                    Vote.objects.filter(date_voted=each_date)
-                    .values("restaurant_id")
-                    .annotate(total_votes=Count("restaurant_id"))
-                    .order_by("-total_votes")[:1][0]["restaurant_id"]
+        restaurant_id = validated_data["restaurant_id"]
+        if menu.restaurant_id == restaurant_id:
+            restaurant = menu.restaurant
+        else:
+            restaurant = Restaurant.objects.filter(pk=restaurant_id).first()
+            if restaurant is None:
+                # The same error as the menu and employee fields give.
+                message = serializers.PrimaryKeyRelatedField.default_error_messages[
+                    "does_not_exist"
+                ]
+                raise serializers.ValidationError(
+                    {"restaurant": [message.format(pk_value=restaurant_id)]}
                 )
-                previous_winner.add(restaurant_id)
-            if len(previous_winner) == 1:
-                restricted_restaurant = previous_winner.pop()
-                if restaurant.pk == restricted_restaurant:
-                    raise serializers.ValidationError(
-                        f"Restaurant {restaurant.restaurant_name} is consecutive winner"
-                        f" for {MAX_CONSECUTIVE_WINNINGS} times and can not be voted."
-                    )
-        if menu.restaurant != restaurant:
+        restricted_restaurant = Vote.objects.consecutive_winner(
+            before=datetime.date.today(), times=MAX_CONSECUTIVE_WINNINGS
+        )
+        if restaurant.pk == restricted_restaurant:
+            raise serializers.ValidationError(
+                f"Restaurant {restaurant.restaurant_name} is consecutive winner"
+                f" for {MAX_CONSECUTIVE_WINNINGS} times and can not be voted."
+            )
+        if menu.restaurant_id != restaurant.pk:
             raise serializers.ValidationError(
                 f"Restaurant {restaurant.restaurant_name} is not having menu voted"
             )
@@ -184,21 +316,162 @@ class VoteSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 f"Only todays menu can be voted. Menu {menu} was posted on {menu.date_posted}"
             )
-        else:
-            votes = Vote.objects.filter(
-                employee=employee,
-                date_voted=datetime.date.today(),
-            ).values("id")
-            if votes.count() > 0:
-                raise serializers.ValidationError("You have already voted for today.")
         return validated_data
 
     def create(self, validated_data):
-        self.validate(validated_data)
-        instance = Vote.objects.create(**validated_data)
+        try:
+            instance = Vote.objects.create(**validated_data)
+        except IntegrityError as exc:
+            if not Vote.is_duplicate_error(exc):
+                raise
+            # unique_employee_daily_vote rejects a second vote for the day.
+            raise serializers.ValidationError(
+                {
+                    api_settings.NON_FIELD_ERRORS_KEY: [
+                        "You have already voted for today."
+                    ]
+                }
+            )
         return instance
 
 
+class BulkVoteListSerializer(serializers.ListSerializer):
+    """Validates a batch of votes with a fixed number of queries and inserts
+    the valid ones with a single ``bulk_create``."""
+
+    def validate(self, attrs):
+        if len(attrs) > MAX_VOTE_BATCH_SIZE:
+            raise serializers.ValidationError(
+                f"At most {MAX_VOTE_BATCH_SIZE} votes can be sent in one batch."
+            )
+        return attrs
+
+    def create(self, validated_data):
+        """Return one result per submitted vote, in the submitted order."""
+        try:
+            return self.cast_votes(validated_data)
+        except IntegrityError as exc:
+            if not Vote.is_duplicate_error(exc):
+                raise
+        # Another request voted for one of the employees after the duplicate
+        # check, validate the batch again against the new rows.
+        try:
+            return self.cast_votes(validated_data)
+        except IntegrityError as exc:
+            if not Vote.is_duplicate_error(exc):
+                raise
+            raise Conflict(
+                "Votes of these employees were cast concurrently, send the batch"
+                " again."
+            )
+
+    def cast_votes(self, validated_data):
+        request = self.context["request"]
+        today = datetime.date.today()
+        employees = dict(
+            Employee.objects.filter(
+                pk__in={vote["employee"] for vote in validated_data}
+            ).values_list("pk", "user_id")
+        )
+        restaurants = dict(
+            Restaurant.objects.filter(
+                pk__in={vote["restaurant"] for vote in validated_data}
+            ).values_list("pk", "restaurant_name")
+        )
+        menus = {
+            menu["pk"]: menu
+            for menu in Menu.objects.filter(
+                pk__in={vote["menu"] for vote in validated_data}
+            ).values("pk", "restaurant_id", "title", "date_posted")
+        }
+        restricted_restaurant = Vote.objects.consecutive_winner(
+            before=today, times=MAX_CONSECUTIVE_WINNINGS
+        )
+        voted = set(
+            Vote.objects.filter(
+                employee__in=employees.keys(), date_voted=today
+            ).values_list("employee_id", flat=True)
+        )
+
+        results = []
+        votes = []
+        for vote in validated_data:
+            restaurant_name = restaurants.get(vote["restaurant"])
+            menu = menus.get(vote["menu"])
+            user_id = employees.get(vote["employee"])
+            if restaurant_name is None or menu is None or user_id is None:
+                results.append({"status": 404, "errors": ["Not found."]})
+            elif user_id != request.user.pk and not request.user.is_staff:
+                results.append(
+                    {
+                        "status": 403,
+                        "errors": [
+                            "You do not have permission to perform this action."
+                        ],
+                    }
+                )
+            elif vote["restaurant"] == restricted_restaurant:
+                results.append(
+                    {
+                        "status": 400,
+                        "errors": [
+                            f"Restaurant {restaurant_name} is consecutive winner"
+                            f" for {MAX_CONSECUTIVE_WINNINGS} times and can not be"
+                            " voted."
+                        ],
+                    }
+                )
+            elif menu["restaurant_id"] != vote["restaurant"]:
+                results.append(
+                    {
+                        "status": 400,
+                        "errors": [
+                            f"Restaurant {restaurant_name} is not having menu voted"
+                        ],
+                    }
+                )
+            elif menu["date_posted"] != today:
+                results.append(
+                    {
+                        "status": 400,
+                        "errors": [
+                            f"Only todays menu can be voted. Menu {menu['title']} "
+                            f"was posted on {menu['date_posted']}"
+                        ],
+                    }
+                )
+            elif vote["employee"] in voted:
+                results.append(
+                    {"status": 400, "errors": ["You have already voted for today."]}
+                )
+            else:
+                voted.add(vote["employee"])
+                votes.append(
+                    Vote(
+                        restaurant_id=vote["restaurant"],
+                        menu_id=vote["menu"],
+                        employee_id=vote["employee"],
+                        date_voted=today,
+                    )
+                )
+                results.append({"status": 201})
+
+        votes = iter(Vote.objects.bulk_create(votes))
+        for result in results:
+            if result["status"] == 201:
+                result["vote"] = VoteSerializer(next(votes)).data
+        return results
+
+
+class BulkVoteSerializer(serializers.Serializer):
+    restaurant = serializers.IntegerField()
+    menu = serializers.IntegerField()
+    employee = serializers.IntegerField()
+
+    class Meta:
+        list_serializer_class = BulkVoteListSerializer
+
+
 class TotalVoteSerializer(serializers.Serializer):
     def to_representation(self, instance):
         return instance["total_votes"]
@@ -206,6 +479,7 @@ class TotalVoteSerializer(serializers.Serializer):
 
 class WinnerSerializer(serializers.ModelSerializer):
 
+    date = serializers.DateField(read_only=True)
     total_votes = TotalVoteSerializer(source="*")
 
     class Meta:
@@ -215,5 +489,132 @@ class WinnerSerializer(serializers.ModelSerializer):
             "restaurant_id",
             "employee_id",
             "pk",
+            "date",
             "total_votes",
         )
+
+
+class DateRangeSerializer(serializers.Serializer):
+    """``from`` and ``to`` query parameters of a range of days."""
+
+    date_from = serializers.DateField()
+    to = serializers.DateField()
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fields["from"] = fields.pop("date_from")
+        return fields
+
+    def validate(self, data):
+        date_from, date_to = data.get("from"), data.get("to")
+        if date_from and date_from > date_to:
+            raise serializers.ValidationError("from must not be after to.")
+        if date_from and (date_to - date_from).days >= MAX_DATE_RANGE_DAYS:
+            raise serializers.ValidationError(
+                f"The range can not span more than {MAX_DATE_RANGE_DAYS} days."
+            )
+        return data
+
+
+class WinnerQuerySerializer(DateRangeSerializer):
+    """Query parameters of the winning-restaurant list: ``date`` for the
+    winner of one day or ``from`` and ``to`` for the winner of every day in
+    a range."""
+
+    date = serializers.DateField(required=False)
+    date_from = serializers.DateField(required=False)
+    to = serializers.DateField(required=False)
+
+    def validate(self, data):
+        date_from, date_to = data.get("from"), data.get("to")
+        if "date" in data and (date_from or date_to):
+            raise serializers.ValidationError(
+                "Use either date or from and to, not both."
+            )
+        if (date_from is None) != (date_to is None):
+            raise serializers.ValidationError("Both from and to are required.")
+        return super().validate(data)
+
+
+def isoformat(value):
+    return None if value is None else value.isoformat()
+
+
+class ValuesSerializer:
+    """Read only serializer for ``QuerySet.values()`` rows.
+
+    ``fields`` lists ``(key, lookup, converter)`` triples: the output key, the
+    ``values()`` lookup it is read from and an optional function applied to
+    the value. The getters are built once per class, so turning a row into
+    the same JSON shape as the matching ``ModelSerializer`` is a tuple fetch
+    and a ``dict(zip())``.
+    """
+
+    fields = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.lookups = tuple(dict.fromkeys(lookup for _, lookup, _ in cls.fields))
+        cls._keys = tuple(key for key, _, _ in cls.fields)
+        cls._getter = itemgetter(*(lookup for _, lookup, _ in cls.fields))
+        cls._converters = tuple(
+            (key, converter) for key, _, converter in cls.fields if converter
+        )
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    @property
+    def data(self):
+        keys, getter, converters = self._keys, self._getter, self._converters
+        data = []
+        for row in self.rows:
+            item = dict(zip(keys, getter(row)))
+            for key, converter in converters:
+                item[key] = converter(item[key])
+            data.append(item)
+        return data
+
+
+class EmployeeValuesSerializer(ValuesSerializer):
+    """``EmployeeProfileSerializer`` output with the user fields merged in."""
+
+    fields = (
+        ("pk", "pk", None),
+        ("department", "department", None),
+        ("username", "user_id", None),
+        ("email", "user__email", None),
+        ("first_name", "user__first_name", None),
+        ("last_name", "user__last_name", None),
+    )
+
+
+class RestaurantValuesSerializer(ValuesSerializer):
+    """``RestaurantProfileSerializer`` output with the user fields merged in."""
+
+    fields = (
+        ("pk", "pk", None),
+        ("restaurant_name", "restaurant_name", None),
+        ("username", "user_id", None),
+        ("email", "user__email", None),
+    )
+
+
+class MenuValuesSerializer(ValuesSerializer):
+    fields = (
+        ("id", "id", None),
+        ("restaurant", "restaurant_id", None),
+        ("title", "title", None),
+        ("description", "description", None),
+        ("date_posted", "date_posted", isoformat),
+    )
+
+
+class VoteValuesSerializer(ValuesSerializer):
+    fields = (
+        ("pk", "id", None),
+        ("restaurant", "restaurant_id", None),
+        ("employee", "employee_id", None),
+        ("date_voted", "date_voted", isoformat),
+        ("menu", "menu_id", None),
+    )
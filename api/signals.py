@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from api.models import RestaurantDailyTally, Vote
+
+
+@receiver(post_delete, sender=Vote)
+def remove_vote_from_tally(sender, instance, using, **kwargs):
+    """Deletions run inside the collector's transaction, so the tally is
+    decremented atomically with the vote row."""
+    RestaurantDailyTally.objects.using(using).add_votes(
+        instance.restaurant_id, instance.date_voted, -1
+    )
@@ -0,0 +1,96 @@
+"""Streaming responses sent from the event loop under ASGI.
+
+Django 3.2's ``ASGIHandler`` iterates the content of a streaming response
+synchronously on the event loop, so a stream waiting for its next part
+stalls every other request of the worker. ``AsyncStreamingHttpResponse``
+takes an async iterator instead, which ``StreamingASGIHandler`` (see
+``restaurant_selection/asgi.py``) sends until it ends or the client
+disconnects.
+"""
+import asyncio
+import contextvars
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
+from django.http.response import HttpResponseBase
+
+_receive = contextvars.ContextVar("receive")
+
+
+class AsyncStreamingHttpResponse(HttpResponseBase):
+    """Response streaming an async iterator of ``str`` or ``bytes`` parts,
+    closed with its ``aclose`` if it has one."""
+
+    streaming = True
+
+    def __init__(self, streaming_content, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.streaming_content = streaming_content
+
+    def __iter__(self):
+        raise TypeError(
+            "AsyncStreamingHttpResponse can only be sent by StreamingASGIHandler."
+        )
+
+
+async def wait_for_disconnect(receive):
+    # The request body was read already, what is left is the disconnect.
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+class StreamingASGIHandler(ASGIHandler):
+    """``ASGIHandler`` also sending ``AsyncStreamingHttpResponse``."""
+
+    async def __call__(self, scope, receive, send):
+        _receive.set(receive)
+        await super().__call__(scope, receive, send)
+
+    async def send_response(self, response, send):
+        if not isinstance(response, AsyncStreamingHttpResponse):
+            await super().send_response(response, send)
+            return
+        headers = []
+        for header, value in response.items():
+            if isinstance(header, str):
+                header = header.encode("ascii")
+            if isinstance(value, str):
+                value = value.encode("latin1")
+            headers.append((bytes(header), bytes(value)))
+        for cookie in response.cookies.values():
+            headers.append(
+                (b"Set-Cookie", cookie.output(header="").encode("ascii").strip())
+            )
+        await send(
+            {
+                "type": "http.response.start",
+                "status": response.status_code,
+                "headers": headers,
+            }
+        )
+        content = response.streaming_content
+        disconnect = asyncio.ensure_future(wait_for_disconnect(_receive.get()))
+        try:
+            while not disconnect.done():
+                part = asyncio.ensure_future(content.__anext__())
+                await asyncio.wait(
+                    {part, disconnect}, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not part.done():
+                    part.cancel()
+                    # Let the iterator unwind before closing it.
+                    await asyncio.wait({part})
+                    break
+                try:
+                    body = response.make_bytes(part.result())
+                except StopAsyncIteration:
+                    await send({"type": "http.response.body"})
+                    break
+                await send(
+                    {"type": "http.response.body", "body": body, "more_body": True}
+                )
+        finally:
+            disconnect.cancel()
+            if hasattr(content, "aclose"):
+                await content.aclose()
+            await sync_to_async(response.close, thread_sensitive=True)()
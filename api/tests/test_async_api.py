@@ -0,0 +1,136 @@
+import datetime
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.authentication import ClaimsJWTAuthentication
+from api.models import Employee, Menu, Restaurant, User, Vote
+from api.throttling import local_store
+from api.utils import UserTypes
+
+
+class AsyncVoteAPITests(APITestCase):
+    """Tests for the async vote create and winning restaurant endpoints"""
+
+    def setUp(self):
+        cache.clear()
+        local_store.clear()
+        restaurant_user = User.objects.create(
+            user_type=UserTypes.RESTAURANT,
+            username="testrestaurant",
+            email="restaurant@test.com",
+        )
+        self.restaurant = Restaurant.objects.create(
+            user=restaurant_user, restaurant_name="restaurant1"
+        )
+        self.menu = Menu.objects.create(
+            restaurant=self.restaurant,
+            title="Dish 1",
+            description="Dish 1 ingredients.",
+        )
+        self.employee_user = User.objects.create(
+            user_type=UserTypes.EMPLOYEE,
+            username="employee1",
+            email="employee@test.com",
+        )
+        self.employee = Employee.objects.create(user=self.employee_user)
+        self.new_vote = {
+            "restaurant": self.restaurant.pk,
+            "employee": self.employee.pk,
+            "menu": self.menu.pk,
+        }
+        token = AccessToken.for_user(self.employee_user)
+        self.headers = {"authorization": f"Bearer {token}"}
+
+    async def test_create_vote_and_get_winner(self):
+        resp = await self.async_client.post(
+            reverse("vote-async"),
+            self.new_vote,
+            content_type="application/json",
+            **self.headers,
+        )
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            {
+                "pk": resp.json()["pk"],
+                "restaurant": self.restaurant.pk,
+                "employee": self.employee.pk,
+                "date_voted": str(datetime.date.today()),
+                "menu": self.menu.pk,
+            },
+            resp.json(),
+        )
+
+        resp = await self.async_client.post(
+            reverse("vote-async"),
+            self.new_vote,
+            content_type="application/json",
+            **self.headers,
+        )
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+        resp = await self.async_client.get(
+            reverse("winning-restaurant-async"), **self.headers
+        )
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [{"restaurant_id": self.restaurant.pk, "total_votes": 1}],
+            resp.json()["results"],
+        )
+
+    async def test_requires_token(self):
+        resp = await self.async_client.get(reverse("winning-restaurant-async"))
+        self.assertEqual(resp.status_code, status.HTTP_401_UNAUTHORIZED)
+        resp = await self.async_client.post(
+            reverse("vote-async"), self.new_vote, content_type="application/json"
+        )
+        self.assertEqual(resp.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(
+        REST_FRAMEWORK={
+            **settings.REST_FRAMEWORK,
+            "DEFAULT_THROTTLE_RATES": {"vote.ip": "1/min"},
+        }
+    )
+    async def test_vote_throttled_before_token_decoded(self):
+        with mock.patch.object(
+            ClaimsJWTAuthentication,
+            "get_validated_token",
+            autospec=True,
+            side_effect=ClaimsJWTAuthentication.get_validated_token,
+        ) as get_validated_token:
+            for expected in (
+                status.HTTP_401_UNAUTHORIZED,
+                status.HTTP_429_TOO_MANY_REQUESTS,
+            ):
+                resp = await self.async_client.post(
+                    reverse("vote-async"),
+                    self.new_vote,
+                    content_type="application/json",
+                    authorization="Bearer invalid",
+                )
+                self.assertEqual(resp.status_code, expected)
+        self.assertIn("Retry-After", resp)
+        self.assertEqual(get_validated_token.call_count, 1)
+
+    @override_settings(
+        REST_FRAMEWORK={
+            **settings.REST_FRAMEWORK,
+            "DEFAULT_THROTTLE_RATES": {"vote.user": "1/min"},
+        }
+    )
+    async def test_vote_throttled_per_user(self):
+        for expected in (status.HTTP_201_CREATED, status.HTTP_429_TOO_MANY_REQUESTS):
+            resp = await self.async_client.post(
+                reverse("vote-async"),
+                self.new_vote,
+                content_type="application/json",
+                **self.headers,
+            )
+            self.assertEqual(resp.status_code, expected)
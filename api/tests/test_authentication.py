@@ -1,8 +1,15 @@
+import base64
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
 
-from api.models import Employee, User
+from api.models import Employee, Menu, Restaurant, User, Vote
 from api.utils import UserTypes
 
 
@@ -42,3 +49,164 @@ class EmployeeAuthTests(APITestCase):
 
         self.assertFalse(resp.context["user"].is_authenticated)
         self.assertEqual(resp.status_code, status.HTTP_200_OK)
+
+
+class CachedBasicAuthTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User(username="testemployee", user_type=UserTypes.EMPLOYEE)
+        self.user.set_password("testpassword")
+        self.user.save()
+        self.employee = Employee.objects.create(user=self.user, department="Tech")
+        self.check_password = mock.patch.object(
+            User, "check_password", autospec=True, side_effect=User.check_password
+        ).start()
+        self.addCleanup(mock.patch.stopall)
+
+    def get_menus(self, password):
+        credentials = base64.b64encode(f"testemployee:{password}".encode()).decode()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Basic {credentials}")
+        return self.client.get(reverse("menu-list"))
+
+    def test_verification_is_cached(self):
+        for _ in range(3):
+            resp = self.get_menus("testpassword")
+            self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.check_password.call_count, 1)
+
+    def test_wrong_password_is_rejected(self):
+        self.get_menus("testpassword")
+        resp = self.get_menus("wrongpassword")
+        self.assertEqual(resp.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_through_api(self):
+        self.get_menus("testpassword")
+        resp = self.client.patch(
+            reverse("employee-detail", kwargs={"pk": self.employee.pk}),
+            data={
+                "user": {
+                    "email": "employee@test.com",
+                    "password": "newpassword",
+                }
+            },
+            format="json",
+        )
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            self.get_menus("testpassword").status_code, status.HTTP_401_UNAUTHORIZED
+        )
+        self.assertEqual(self.get_menus("newpassword").status_code, status.HTTP_200_OK)
+
+    def test_password_change_elsewhere(self):
+        self.get_menus("testpassword")
+        self.user.set_password("newpassword")
+        self.user.save()
+        self.assertEqual(
+            self.get_menus("testpassword").status_code, status.HTTP_401_UNAUTHORIZED
+        )
+
+    def test_inactive_user_is_rejected(self):
+        self.get_menus("testpassword")
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(
+            self.get_menus("testpassword").status_code, status.HTTP_401_UNAUTHORIZED
+        )
+
+
+class ClaimsJWTAuthTests(APITestCase):
+    def setUp(self):
+        restaurant_user = User.objects.create(
+            username="testrestaurant", user_type=UserTypes.RESTAURANT
+        )
+        restaurant = Restaurant.objects.create(
+            user=restaurant_user, restaurant_name="restaurant1"
+        )
+        menu = Menu.objects.create(
+            restaurant=restaurant, title="Dish 1", description="Dish 1"
+        )
+        self.user = User(username="testemployee", user_type=UserTypes.EMPLOYEE)
+        self.user.set_password("testpassword")
+        self.user.save()
+        self.employee = Employee.objects.create(user=self.user, department="Tech")
+        self.vote = Vote.objects.create(
+            restaurant=restaurant, menu=menu, employee=self.employee
+        )
+
+    def obtain_access_token(self):
+        resp = self.client.post(
+            reverse("token_obtain_pair"),
+            {"username": "testemployee", "password": "testpassword"},
+            format="json",
+        )
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        return resp.json()["access"]
+
+    def user_queries(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(reverse("vote-list"))
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        return [query for query in queries if '"api_user"' in query["sql"]]
+
+    def test_token_carries_claims(self):
+        token = AccessToken(self.obtain_access_token())
+        self.assertEqual(token["user_type"], UserTypes.EMPLOYEE)
+        self.assertFalse(token["is_staff"])
+        self.assertEqual(token["employee_id"], self.employee.pk)
+        self.assertIsNone(token["restaurant_id"])
+
+    def test_no_user_lookup(self):
+        self.assertEqual(self.user_queries(self.obtain_access_token()), [])
+
+    def test_token_without_claims_loads_user(self):
+        self.assertEqual(len(self.user_queries(AccessToken.for_user(self.user))), 1)
+
+    def test_refreshed_token_keeps_claims(self):
+        resp = self.client.post(
+            reverse("token_obtain_pair"),
+            {"username": "testemployee", "password": "testpassword"},
+            format="json",
+        )
+        resp = self.client.post(
+            reverse("token_refresh"), {"refresh": resp.json()["refresh"]}
+        )
+        self.assertEqual(self.user_queries(resp.json()["access"]), [])
+
+    def obtain_refresh_token(self):
+        resp = self.client.post(
+            reverse("token_obtain_pair"),
+            {"username": "testemployee", "password": "testpassword"},
+            format="json",
+        )
+        return resp.json()["refresh"]
+
+    def test_refresh_refused_for_inactive_user(self):
+        refresh = self.obtain_refresh_token()
+        self.user.is_active = False
+        self.user.save()
+        resp = self.client.post(reverse("token_refresh"), {"refresh": refresh})
+        self.assertEqual(resp.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertNotIn("access", resp.json())
+
+    def test_refresh_refused_for_deleted_user(self):
+        refresh = self.obtain_refresh_token()
+        self.user.delete()
+        resp = self.client.post(reverse("token_refresh"), {"refresh": refresh})
+        self.assertEqual(resp.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_issues_current_claims(self):
+        self.user.is_staff = True
+        self.user.save()
+        refresh = self.obtain_refresh_token()
+        self.user.is_staff = False
+        self.user.save()
+        resp = self.client.post(reverse("token_refresh"), {"refresh": refresh})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertFalse(AccessToken(resp.json()["access"])["is_staff"])
+
+    def test_owner_permission(self):
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {self.obtain_access_token()}"
+        )
+        resp = self.client.get(reverse("vote-detail", kwargs={"pk": self.vote.pk}))
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
@@ -1,7 +1,17 @@
+import io
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 
+from api.constants import MAX_EMPLOYEE_IMPORT_REQUEST_SIZE
 from api.models import Employee, User
 from api.utils import UserTypes
 
@@ -115,3 +125,116 @@ class EmployeesAPITests(APITestCase):
         resp = self.client.delete(url)
         self.assertEqual(resp.status_code, status.HTTP_204_NO_CONTENT)
         self.assertFalse(Employee.objects.filter(pk=self.employee.pk).exists())
+
+    def test_employee_list_query_count(self):
+        # a page costs the count and one joined select, whatever its size
+        self.client.force_authenticate(self.admin_user)
+        url = reverse("employee-list")
+        for index in range(50):
+            user = User.objects.create(
+                user_type=UserTypes.EMPLOYEE, username=f"employee{index}"
+            )
+            Employee.objects.create(user=user, department="Tech")
+        with self.assertNumQueries(2):
+            resp = self.client.get(url, {"limit": 50})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(resp.json()["results"]), 50)
+
+    def test_employee_list_fast_serializer(self):
+        self.client.force_authenticate(self.admin_user)
+        url = reverse("employee-list")
+        expected = self.client.get(url).json()
+        with override_settings(FAST_LIST_SERIALIZERS=True):
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.json(), expected)
+
+    def import_rows(self, count, start=0):
+        return [
+            {
+                "username": f"imported{index}",
+                "email": f"imported{index}@test.com",
+                "password": f"password{index}",
+                "department": "Sales",
+            }
+            for index in range(start, start + count)
+        ]
+
+    def test_import_employees(self):
+        self.client.force_authenticate(self.admin_user)
+        url = reverse("employee-import")
+        resp = self.client.post(url, self.import_rows(3), format="json")
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(resp.json(), {"created": 3})
+        user = User.objects.get(username="imported2")
+        self.assertEqual(user.user_type, UserTypes.EMPLOYEE)
+        self.assertTrue(user.check_password("password2"))
+        self.assertEqual(user.employee_profile.department, "Sales")
+
+    def test_import_employees_csv_upload(self):
+        self.client.force_authenticate(self.admin_user)
+        upload = SimpleUploadedFile(
+            "employees.csv",
+            b"username,email,password\r\nimported0,imported0@test.com,secret\r\n",
+        )
+        resp = self.client.post(reverse("employee-import"), {"file": upload})
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(Employee.objects.filter(user_id="imported0").exists())
+
+    def test_import_employees_uniqueness(self):
+        self.client.force_authenticate(self.admin_user)
+        rows = self.import_rows(3)
+        rows[1]["username"] = "testemployee"
+        rows[2]["email"] = rows[0]["email"]
+        resp = self.client.post(reverse("employee-import"), rows, format="json")
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        errors = resp.json()
+        self.assertEqual(errors[0], {})
+        self.assertIn("username", errors[1])
+        self.assertIn("email", errors[2])
+        self.assertFalse(User.objects.filter(username__startswith="imported").exists())
+
+    def test_import_employees_request_size_limit(self):
+        self.client.force_authenticate(self.admin_user)
+        resp = self.client.post(
+            reverse("employee-import"),
+            self.import_rows(MAX_EMPLOYEE_IMPORT_REQUEST_SIZE + 1),
+            format="json",
+        )
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(User.objects.filter(username__startswith="imported").exists())
+
+    @override_settings(EMPLOYEE_IMPORT_WORKERS=2)
+    def test_import_employees_requires_list(self):
+        self.client.force_authenticate(self.admin_user)
+        for body in (5, True):
+            resp = self.client.post(reverse("employee-import"), body, format="json")
+            self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_import_employees_hashes_in_request_process(self):
+        self.client.force_authenticate(self.admin_user)
+        with mock.patch("api.onboarding.ProcessPoolExecutor") as executor:
+            resp = self.client.post(
+                reverse("employee-import"), self.import_rows(3), format="json"
+            )
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        executor.assert_not_called()
+
+    def test_import_employees_admin_only(self):
+        resp = self.client.post(
+            reverse("employee-import"), self.import_rows(1), format="json"
+        )
+        self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(EMPLOYEE_IMPORT_WORKERS=2)
+    def test_import_employees_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "employees.json")
+            with open(path, "w") as file:
+                json.dump(self.import_rows(4), file)
+            output = io.StringIO()
+            call_command("import_employees", path, "--format", "json", stdout=output)
+        self.assertIn("Imported 4 employees", output.getvalue())
+        self.assertTrue(
+            User.objects.get(username="imported3").check_password("password3")
+        )
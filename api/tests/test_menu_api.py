@@ -1,10 +1,12 @@
 import datetime
 
+from django.core.cache import cache
+from django.test import override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 
-from api.models import Employee, Menu, Restaurant, User
+from api.models import Employee, Menu, Restaurant, TableVersion, User
 from api.utils import UserTypes
 
 
@@ -130,3 +132,77 @@ class RestaurantMenuAPITests(APITestCase):
         resp = self.client.delete(url)
         self.assertEqual(resp.status_code, status.HTTP_204_NO_CONTENT)
         self.assertFalse(Menu.objects.filter(pk=self.menu1.id).exists())
+
+    def test_menu_list_keyset_pagination(self):
+        self.client.force_authenticate(self.employee_user)
+        url = reverse("menu-list")
+        resp = self.client.get(url, {"limit": 1})
+        self.assertEqual(resp.json()["results"], [self.menu1_data])
+        self.assertIsNone(resp.json()["previous"])
+        resp = self.client.get(resp.json()["next"])
+        self.assertEqual(resp.json()["results"], [self.menu2_data])
+        self.assertIsNone(resp.json()["next"])
+        resp = self.client.get(resp.json()["previous"])
+        self.assertEqual(resp.json()["results"], [self.menu1_data])
+        self.assertIsNone(resp.json()["previous"])
+
+    def test_menu_list_fast_serializer(self):
+        self.client.force_authenticate(self.employee_user)
+        url = reverse("menu-list")
+        expected = self.client.get(url, {"limit": 1}).json()
+        with override_settings(FAST_LIST_SERIALIZERS=True):
+            resp = self.client.get(url, {"limit": 1})
+            self.assertEqual(resp.json(), expected)
+            resp = self.client.get(resp.json()["next"])
+        self.assertEqual(resp.json()["results"], [self.menu2_data])
+
+    def test_menu_list_conditional_get(self):
+        self.client.force_authenticate(self.employee_user)
+        url = reverse("menu-list")
+        resp = self.client.get(url)
+        etag = resp["ETag"]
+        self.assertTrue(resp.has_header("Last-Modified"))
+
+        # only the table version is read
+        with self.assertNumQueries(1):
+            resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(resp["ETag"], etag)
+
+        # another worker, starting with an empty cache, has the same version
+        cache.clear()
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.menu2.title = "Dish 3"
+        self.menu2.save()
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(resp["ETag"], etag)
+
+    def test_todays_menu_list_snapshot(self):
+        self.client.force_authenticate(self.employee_user)
+        url = reverse("menu-list")
+        resp = self.client.get(url)
+        self.assertEqual(resp.json()["results"], self.menu_data)
+
+        with self.assertNumQueries(1):
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp["Content-Type"], "application/json")
+        self.assertEqual(resp.json()["results"], self.menu_data)
+
+        self.menu2.delete()
+        resp = self.client.get(url)
+        self.assertEqual(resp.json()["results"], [self.menu1_data])
+
+    def test_snapshot_follows_changes_of_other_workers(self):
+        self.client.force_authenticate(self.employee_user)
+        url = reverse("menu-list")
+        self.client.get(url)
+
+        # a save in another worker changes the rows and the version row only
+        Menu.objects.filter(pk=self.menu1.pk).update(title="Dish 3")
+        TableVersion.objects.filter(label="api.menu").update(token="other")
+        resp = self.client.get(url)
+        self.assertEqual(resp.json()["results"][0]["title"], "Dish 3")
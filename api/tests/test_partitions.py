@@ -0,0 +1,101 @@
+import datetime
+import io
+import unittest
+
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import SimpleTestCase, TestCase
+
+from api.models import Employee, Menu, Restaurant, User, Vote
+from api.partitions import (add_months, create_partition,
+                            default_partition_name, month_start, parse_bounds,
+                            partition_name)
+from api.utils import UserTypes
+
+postgresql_only = unittest.skipUnless(
+    connection.vendor == "postgresql", "Votes are partitioned on PostgreSQL only"
+)
+
+
+class VotePartitionTests(SimpleTestCase):
+    def test_add_months(self):
+        month = datetime.date(2021, 11, 1)
+        self.assertEqual(add_months(month, 1), datetime.date(2021, 12, 1))
+        self.assertEqual(add_months(month, 2), datetime.date(2022, 1, 1))
+        self.assertEqual(add_months(month, -11), datetime.date(2020, 12, 1))
+
+    def test_partition_bounds(self):
+        self.assertEqual(partition_name(datetime.date(2021, 6, 1)), "api_vote_p202106")
+        self.assertEqual(
+            parse_bounds("FOR VALUES FROM ('2021-06-01') TO ('2021-07-01')"),
+            (datetime.date(2021, 6, 1), datetime.date(2021, 7, 1)),
+        )
+        self.assertIsNone(parse_bounds("DEFAULT"))
+
+
+class ManageVotePartitionsTests(TestCase):
+    @unittest.skipIf(
+        connection.vendor == "postgresql", "Migration 0006 partitions the votes"
+    )
+    def test_unpartitioned_database(self):
+        out = io.StringIO()
+        call_command("manage_vote_partitions", "--retain-months", "12", stdout=out)
+        self.assertEqual(
+            out.getvalue(), "The vote table is not partitioned, nothing to do.\n"
+        )
+
+    @postgresql_only
+    def test_partitioned_table_keeps_constraints(self):
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT contype, pg_get_constraintdef(oid) FROM pg_constraint
+                WHERE conrelid = 'api_vote'::regclass
+                """)
+            constraints = cursor.fetchall()
+        self.assertIn(("p", "PRIMARY KEY (id, date_voted)"), constraints)
+        self.assertIn(("u", "UNIQUE (employee_id, date_voted)"), constraints)
+        self.assertEqual(
+            sorted(
+                definition.split(" REFERENCES ")[1].split("(")[0]
+                for kind, definition in constraints
+                if kind == "f"
+            ),
+            ["api_employee", "api_menu", "api_restaurant"],
+        )
+
+    @postgresql_only
+    def test_create_partition_moves_default_rows(self):
+        restaurant_user = User.objects.create(
+            user_type=UserTypes.RESTAURANT, username="testrestaurant"
+        )
+        restaurant = Restaurant.objects.create(
+            user=restaurant_user, restaurant_name="restaurant1"
+        )
+        menu = Menu.objects.create(
+            restaurant=restaurant, title="Dish 1", description="Dish 1 ingredients."
+        )
+        employee = Employee.objects.create(
+            user=User.objects.create(username="testemployee")
+        )
+        # beyond the partitions created ahead, the vote lands in the default one
+        month = add_months(month_start(datetime.date.today()), 24)
+        Vote.objects.create(
+            employee=employee, restaurant=restaurant, menu=menu, date_voted=month
+        )
+        self.assertEqual(self.partition_of(month), default_partition_name())
+
+        self.assertEqual(create_partition(connection, month), 1)
+        self.assertEqual(self.partition_of(month), partition_name(month))
+        self.assertEqual(create_partition(connection, month), 0)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Vote.objects.create(
+                employee=employee, restaurant=restaurant, menu=menu, date_voted=month
+            )
+
+    def partition_of(self, date):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT tableoid::regclass::text FROM api_vote WHERE date_voted = %s",
+                [date],
+            )
+            return cursor.fetchone()[0]
@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from api.models import Employee, Menu, Restaurant, User, Vote
+from api.permissions import (EmployeeViewSetPermission, IsEmployeeUserOrAdmin,
+                             RestaurantViewSetPermission)
+from api.utils import UserTypes
+
+
+@mock.patch(
+    "django.urls.resolvers.URLResolver._reverse_with_prefix",
+    side_effect=AssertionError("URL reversed in a permission check"),
+)
+class ObjectPermissionTests(APITestCase):
+    def setUp(self):
+        restaurant_user = User.objects.create(
+            username="testrestaurant", user_type=UserTypes.RESTAURANT
+        )
+        restaurant = Restaurant.objects.create(
+            user=restaurant_user, restaurant_name="restaurant1"
+        )
+        menu = Menu.objects.create(
+            restaurant=restaurant, title="Dish 1", description="Dish 1"
+        )
+        self.user = User.objects.create(
+            username="employee1", user_type=UserTypes.EMPLOYEE
+        )
+        employee = Employee.objects.create(user=self.user, department="Tech")
+        other_user = User.objects.create(
+            username="employee2", user_type=UserTypes.EMPLOYEE
+        )
+        Employee.objects.create(user=other_user, department="Tech")
+        Vote.objects.create(restaurant=restaurant, menu=menu, employee=employee)
+
+        self.request = APIRequestFactory().get("/")
+        self.request.user = self.user
+        self.view = SimpleNamespace(action="retrieve")
+
+    def check(self, permission, obj):
+        with self.assertNumQueries(0):
+            return permission.has_object_permission(self.request, self.view, obj)
+
+    def test_vote(self, _):
+        vote = Vote.objects.select_related("employee").get()
+        self.assertTrue(self.check(IsEmployeeUserOrAdmin(), vote))
+        self.request.user = User.objects.get(pk="employee2")
+        self.assertFalse(self.check(IsEmployeeUserOrAdmin(), vote))
+
+    def test_employee(self, _):
+        permission = EmployeeViewSetPermission()
+        self.assertTrue(self.check(permission, Employee.objects.get(user=self.user)))
+        self.assertFalse(
+            self.check(permission, Employee.objects.get(user_id="employee2"))
+        )
+
+    def test_restaurant(self, _):
+        self.assertFalse(
+            self.check(RestaurantViewSetPermission(), Restaurant.objects.get())
+        )
+        self.request.user = User.objects.get(pk="testrestaurant")
+        self.assertTrue(
+            self.check(RestaurantViewSetPermission(), Restaurant.objects.get())
+        )
@@ -1,3 +1,4 @@
+from django.test import override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
@@ -106,3 +107,37 @@ class RestaurantsAPITests(APITestCase):
         resp = self.client.delete(url)
         self.assertEqual(resp.status_code, status.HTTP_204_NO_CONTENT)
         self.assertFalse(Restaurant.objects.filter(pk=self.restaurant.pk).exists())
+
+    def test_restaurant_list_query_count(self):
+        # a page costs the table version, the count and one joined select,
+        # whatever its size
+        url = reverse("restaurant-list")
+        for index in range(50):
+            user = User.objects.create(
+                user_type=UserTypes.RESTAURANT, username=f"restaurant{index}"
+            )
+            Restaurant.objects.create(user=user, restaurant_name=f"restaurant{index}")
+        with self.assertNumQueries(3):
+            resp = self.client.get(url, {"limit": 50})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(resp.json()["results"]), 50)
+
+    def test_restaurant_list_fast_serializer(self):
+        url = reverse("restaurant-list")
+        expected = self.client.get(url).json()
+        with override_settings(FAST_LIST_SERIALIZERS=True):
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.json(), expected)
+
+    def test_restaurant_detail_conditional_get(self):
+        url = reverse("restaurant-detail", kwargs={"pk": self.restaurant.pk})
+        etag = self.client.get(url)["ETag"]
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.user.email = "new@test.com"
+        self.user.save()
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.json()["email"], "new@test.com")
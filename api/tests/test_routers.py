@@ -0,0 +1,170 @@
+from django.core.cache import cache, caches
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api import routers
+from api.checks import check_read_your_writes_cache
+from api.models import Employee, Menu, Restaurant, User, Vote
+from api.routers import ReadReplicaRouter, use_primary, use_replica
+from api.utils import UserTypes
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class ReadReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ReadReplicaRouter()
+
+    def test_reads_use_primary_by_default(self):
+        self.assertEqual(self.router.db_for_read(Vote), "default")
+
+    def test_reads_use_replica_inside_use_replica(self):
+        with use_replica():
+            self.assertEqual(self.router.db_for_read(Vote), "replica")
+            self.assertEqual(self.router.db_for_write(Vote), "default")
+            with use_primary():
+                self.assertEqual(self.router.db_for_read(Vote), "default")
+            self.assertEqual(self.router.db_for_read(Vote), "replica")
+        self.assertEqual(self.router.db_for_read(Vote), "default")
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas_configured(self):
+        with use_replica():
+            self.assertEqual(self.router.db_for_read(Vote), "default")
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class ReplicaReadTests(APITestCase):
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        cache.clear()
+        self.restaurant, self.menu = self.create_menu("default", "Dish 1")
+        self.employee_user = User.objects.create(
+            username="employee1", user_type=UserTypes.EMPLOYEE
+        )
+        self.employee = Employee.objects.create(
+            user=self.employee_user, department="Tech"
+        )
+        self.client.force_authenticate(self.employee_user)
+
+    def create_menu(self, using, title):
+        restaurant_user = User.objects.db_manager(using).create(
+            username="testrestaurant", user_type=UserTypes.RESTAURANT
+        )
+        restaurant = Restaurant.objects.db_manager(using).create(
+            user=restaurant_user, restaurant_name="restaurant1"
+        )
+        menu = Menu.objects.db_manager(using).create(
+            restaurant=restaurant, title=title, description=title
+        )
+        return restaurant, menu
+
+    def test_list_and_retrieve_read_from_replica(self):
+        _, menu = self.create_menu("replica", "Replicated dish")
+        resp = self.client.get(reverse("menu-list"))
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [result["title"] for result in resp.json()["results"]],
+            ["Replicated dish"],
+        )
+        resp = self.client.get(reverse("menu-detail", kwargs={"pk": menu.pk}))
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.json()["title"], "Replicated dish")
+
+    def test_winner_reads_from_replica(self):
+        restaurant, menu = self.create_menu("replica", "Replicated dish")
+        employee = Employee.objects.db_manager("replica").create(
+            user=User.objects.db_manager("replica").create(username="employee1")
+        )
+        Vote.objects.db_manager("replica").create(
+            restaurant=restaurant, menu=menu, employee=employee
+        )
+        resp = self.client.get(reverse("winning-restaurant-list"))
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.json()["results"][0]["total_votes"], 1)
+
+    def test_winner_includes_own_vote_despite_stale_replica(self):
+        resp = self.client.post(
+            reverse("vote-list"),
+            {
+                "restaurant": self.restaurant.pk,
+                "employee": self.employee.pk,
+                "menu": self.menu.pk,
+            },
+            format="json",
+        )
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        # another user reads the ranking from the replica, which lags behind
+        other_user = User.objects.create(
+            username="employee2", user_type=UserTypes.EMPLOYEE
+        )
+        self.client.force_authenticate(other_user)
+        resp = self.client.get(reverse("winning-restaurant-list"))
+        self.assertEqual(resp.json()["results"], [])
+
+        self.client.force_authenticate(self.employee_user)
+        resp = self.client.get(reverse("winning-restaurant-list"))
+        self.assertEqual(
+            resp.json()["results"],
+            [{"restaurant_id": self.restaurant.pk, "total_votes": 1}],
+        )
+
+    def test_writes_pin_reads_to_primary(self):
+        resp = self.client.post(
+            reverse("vote-list"),
+            {
+                "restaurant": self.restaurant.pk,
+                "employee": self.employee.pk,
+                "menu": self.menu.pk,
+            },
+            format="json",
+        )
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        resp = self.client.get(reverse("vote-list"))
+        self.assertEqual(len(resp.json()["results"]), 1)
+
+        # once the marker expires, reads go to the replica again
+        cache.delete(routers._recent_write_key(self.employee_user))
+        resp = self.client.get(reverse("vote-list"))
+        self.assertEqual(resp.json()["results"], [])
+
+    @override_settings(
+        CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+            "shared": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                "LOCATION": "shared",
+            },
+        },
+        READ_YOUR_WRITES={"ALIAS": "shared", "SECONDS": 5},
+    )
+    def test_marker_kept_in_configured_cache(self):
+        routers.note_write(self.employee_user)
+        self.assertTrue(
+            caches["shared"].get(routers._recent_write_key(self.employee_user))
+        )
+        self.assertIsNone(cache.get(routers._recent_write_key(self.employee_user)))
+
+
+class ReadYourWritesCheckTests(SimpleTestCase):
+    @override_settings(DATABASE_REPLICAS=["replica"])
+    def test_per_process_cache_rejected_with_replicas(self):
+        errors = check_read_your_writes_cache(None)
+        self.assertEqual([error.id for error in errors], ["api.E001"])
+
+    @override_settings(
+        DATABASE_REPLICAS=["replica"],
+        CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+                "LOCATION": "api_cache",
+            }
+        },
+    )
+    def test_shared_cache_accepted(self):
+        self.assertEqual(check_read_your_writes_cache(None), [])
+
+    def test_no_replicas(self):
+        self.assertEqual(check_read_your_writes_cache(None), [])
@@ -0,0 +1,153 @@
+import base64
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.models import Employee, User
+from api.throttling import LocalWindowStore, local_store
+from api.utils import UserTypes
+
+RATES = {
+    "token.ip": "100/min",
+    "token.claimed": "2/min",
+    "token.user": "2/min",
+    "vote.ip": "100/min",
+    "vote.claimed": "1/min",
+    "vote.user": "1/min",
+    "signup.ip": "1/hour",
+}
+
+
+class LocalWindowStoreTests(SimpleTestCase):
+    @mock.patch("api.throttling.time.monotonic")
+    def test_sliding_window(self, monotonic):
+        store = LocalWindowStore()
+        monotonic.return_value = 60
+        self.assertIsNone(store.hit("key", 2, 60))
+        self.assertIsNone(store.hit("key", 2, 60))
+        self.assertEqual(store.hit("key", 2, 60), 60)
+        # Half way through the next window half of the previous one counts.
+        monotonic.return_value = 150
+        self.assertIsNone(store.hit("key", 2, 60))
+        self.assertIsNotNone(store.hit("key", 2, 60))
+        monotonic.return_value = 240
+        self.assertIsNone(store.hit("key", 2, 60))
+
+    @mock.patch("api.throttling.time.monotonic", return_value=60)
+    def test_least_recently_hit_key_dropped(self, monotonic):
+        store = LocalWindowStore()
+        store.max_keys = 2
+        for key in ("a", "a", "b"):
+            self.assertIsNone(store.hit(key, 2, 60))
+        # a throttled request counts as a use of its key too
+        self.assertIsNotNone(store.hit("a", 2, 60))
+        self.assertIsNone(store.hit("c", 2, 60))
+        self.assertEqual(list(store._windows), ["a", "c"])
+        self.assertIsNotNone(store.hit("a", 2, 60))
+
+
+@override_settings(
+    REST_FRAMEWORK={**settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": RATES}
+)
+class ThrottleTests(APITestCase):
+    def setUp(self):
+        local_store.clear()
+        cache.clear()
+        self.user = User(username="testemployee", user_type=UserTypes.EMPLOYEE)
+        self.user.set_password("testpassword")
+        self.user.save()
+        Employee.objects.create(user=self.user, department="Tech")
+
+    def obtain_token(self, username, password="wrongpassword", ip="127.0.0.1"):
+        return self.client.post(
+            reverse("token_obtain_pair"),
+            {"username": username, "password": password},
+            format="json",
+            REMOTE_ADDR=ip,
+        )
+
+    def test_token_throttled_per_claimed_user(self):
+        for _ in range(2):
+            resp = self.obtain_token("testemployee")
+            self.assertEqual(resp.status_code, status.HTTP_401_UNAUTHORIZED)
+        resp = self.obtain_token("testemployee")
+        self.assertEqual(resp.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn("Retry-After", resp)
+        resp = self.obtain_token("otheremployee")
+        self.assertEqual(resp.status_code, status.HTTP_401_UNAUTHORIZED)
+        # the claimed username is counted per IP, others can still log in
+        resp = self.obtain_token("testemployee", "testpassword", ip="10.0.0.2")
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+
+    def test_token_claimed_user_ignores_authorization_header(self):
+        # the token view reads the username from the body, whatever the header
+        headers = [
+            "Foo bar",
+            "Basic " + base64.b64encode(b"random1:x").decode(),
+            "Basic " + base64.b64encode(b"random2:x").decode(),
+        ]
+        for header in headers:
+            resp = self.client.post(
+                reverse("token_obtain_pair"),
+                {"username": "testemployee", "password": "wrongpassword"},
+                format="json",
+                HTTP_AUTHORIZATION=header,
+            )
+        self.assertEqual(resp.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_token_throttled_per_user_after_authentication(self):
+        for ip in ("10.0.0.1", "10.0.0.2"):
+            resp = self.obtain_token("testemployee", "testpassword", ip=ip)
+            self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        resp = self.obtain_token("testemployee", "testpassword", ip="10.0.0.3")
+        self.assertEqual(resp.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(THROTTLE_STORE={"BACKEND": "cache", "ALIAS": "default"})
+    def test_cache_store(self):
+        self.obtain_token("testemployee")
+        self.obtain_token("testemployee")
+        resp = self.obtain_token("testemployee")
+        self.assertEqual(resp.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_vote_throttled_before_authentication(self):
+        credentials = base64.b64encode(b"testemployee:wrongpassword").decode()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Basic {credentials}")
+        url = reverse("vote-list")
+        with mock.patch.object(
+            User, "check_password", autospec=True, side_effect=User.check_password
+        ) as check_password:
+            resp = self.client.post(url, {}, format="json")
+            self.assertEqual(resp.status_code, status.HTTP_401_UNAUTHORIZED)
+            resp = self.client.post(url, {}, format="json")
+            self.assertEqual(resp.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+            self.assertEqual(check_password.call_count, 1)
+            # the same username from another IP is still checked
+            resp = self.client.post(url, {}, format="json", REMOTE_ADDR="10.0.0.2")
+            self.assertEqual(resp.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(check_password.call_count, 2)
+
+    def test_vote_throttled_per_authenticated_user(self):
+        self.client.force_authenticate(self.user)
+        url = reverse("vote-list")
+        resp = self.client.post(url, {}, format="json")
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        resp = self.client.post(url, {}, format="json", REMOTE_ADDR="10.0.0.2")
+        self.assertEqual(resp.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_vote_list_not_throttled(self):
+        self.client.force_authenticate(self.user)
+        for _ in range(3):
+            resp = self.client.get(reverse("vote-list"))
+            self.assertEqual(resp.status_code, status.HTTP_200_OK)
+
+    def test_signup_throttled_per_ip(self):
+        url = reverse("employee-list")
+        resp = self.client.post(url, {}, format="json")
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        resp = self.client.post(url, {}, format="json")
+        self.assertEqual(resp.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
@@ -1,10 +1,18 @@
+import csv
 import datetime
+import io
+import json
+from unittest import mock
 
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.test import override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 
 from api.models import Employee, Menu, Restaurant, User, Vote
+from api.serializers import BulkVoteListSerializer
 from api.utils import UserTypes
 
 
@@ -124,6 +132,19 @@ class VoteAPITests(APITestCase):
         self.assertEqual(resp.status_code, status.HTTP_200_OK)
         self.assertEqual(self.votes_data[0], resp.json())
 
+    def test_create_vote_missing_objects(self):
+        # unknown pks are rejected like the model fields always did, with 400
+        Vote.objects.filter(employee=1).delete()
+        self.client.force_authenticate(self.employee_user)
+        url = reverse("vote-list")
+        for field in ("restaurant", "menu", "employee"):
+            data = {**self.new_vote_emp1, field: 99}
+            resp = self.client.post(url, data, format="json")
+            self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(
+                resp.json(), {field: ['Invalid pk "99" - object does not exist.']}
+            )
+
     def test_create_second_vote(self):
         Vote.objects.filter(employee=1).delete()
         self.client.force_authenticate(self.employee_user)
@@ -140,3 +161,194 @@ class VoteAPITests(APITestCase):
         url = reverse("vote-list")
         resp = self.client.post(url, self.new_vote_emp2, format="json")
         self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_bulk_create_votes(self):
+        Vote.objects.filter(employee=1).delete()
+        self.client.force_authenticate(self.employee_user)
+        url = reverse("vote-bulk")
+        votes = [
+            self.new_vote_emp1,
+            self.new_vote_emp1,
+            self.new_vote_emp2,
+            {"restaurant": 1, "employee": 1, "menu": 99},
+        ]
+        resp = self.client.post(url, votes, format="json")
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [
+                {"status": 201, "vote": self.vote_created},
+                {"status": 400, "errors": ["You have already voted for today."]},
+                {
+                    "status": 403,
+                    "errors": ["You do not have permission to perform this action."],
+                },
+                {"status": 404, "errors": ["Not found."]},
+            ],
+            resp.json(),
+        )
+
+    def test_bulk_create_votes_requires_list(self):
+        self.client.force_authenticate(self.employee_user)
+        for body in (5, True):
+            resp = self.client.post(reverse("vote-bulk"), body, format="json")
+            self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_create_votes_query_count(self):
+        Vote.objects.all().delete()
+        admin_user = User(username="admin", email="admin@test.com", is_staff=True)
+        admin_user.save()
+        employees = [self.employee, self.employee_2]
+        for index in range(3, 11):
+            user = User.objects.create(
+                username=f"employee{index}", email=f"employee{index}@test.com"
+            )
+            employees.append(Employee.objects.create(user=user))
+        votes = [
+            {"restaurant": 1, "employee": employee.pk, "menu": 1}
+            for employee in employees
+        ]
+        self.client.force_authenticate(admin_user)
+        url = reverse("vote-bulk")
+        with self.assertNumQueries(10):
+            resp = self.client.post(url, votes, format="json")
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(Vote.objects.count(), len(employees))
+
+    def test_duplicate_vote_rejected_by_constraint(self):
+        with self.assertRaises(IntegrityError) as raised:
+            with transaction.atomic():
+                Vote.objects.create(
+                    restaurant=self.restaurant,
+                    menu=self.menu1,
+                    employee=self.employee,
+                )
+        self.assertTrue(Vote.is_duplicate_error(raised.exception))
+        self.assertEqual(Vote.objects.filter(employee=self.employee).count(), 1)
+
+    def test_create_vote_other_integrity_error_not_hidden(self):
+        Vote.objects.filter(employee=1).delete()
+        self.client.force_authenticate(self.employee_user)
+        error = IntegrityError("FOREIGN KEY constraint failed")
+        with mock.patch.object(Vote.objects, "create", side_effect=error):
+            with self.assertRaises(IntegrityError):
+                self.client.post(
+                    reverse("vote-list"), self.new_vote_emp1, format="json"
+                )
+
+    def test_bulk_create_votes_concurrent_conflict(self):
+        self.client.force_authenticate(self.employee_user)
+        error = IntegrityError(
+            "UNIQUE constraint failed: api_vote.employee_id, api_vote.date_voted"
+        )
+        with mock.patch.object(
+            BulkVoteListSerializer, "cast_votes", side_effect=error
+        ) as cast_votes:
+            resp = self.client.post(
+                reverse("vote-bulk"), [self.new_vote_emp1], format="json"
+            )
+        self.assertEqual(resp.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(cast_votes.call_count, 2)
+
+    def test_create_vote_query_count(self):
+        # menu with restaurant, employee, consecutive winner check, and the
+        # insert with its tally update inside a savepoint
+        Vote.objects.filter(employee=1).delete()
+        self.client.force_authenticate(self.employee_user)
+        url = reverse("vote-list")
+        with self.assertNumQueries(7):
+            resp = self.client.post(url, self.new_vote_emp1, format="json")
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+
+    def test_votes_list_keyset_pagination(self):
+        today = datetime.date.today()
+        for day in range(1, 4):
+            for employee in (self.employee, self.employee_2):
+                Vote.objects.create(
+                    restaurant=self.restaurant,
+                    menu=self.menu1,
+                    employee=employee,
+                    date_voted=today - datetime.timedelta(day),
+                )
+        expected = list(Vote.objects.values_list("pk", flat=True))
+        self.assertEqual(len(expected), 7)
+
+        self.client.force_authenticate(self.employee_user)
+        url = reverse("vote-list")
+        resp = self.client.get(url, {"include_previous": "true", "limit": 2})
+        self.assertNotIn("count", resp.json())
+        self.assertIsNone(resp.json()["previous"])
+        pages = [resp.json()]
+        while pages[-1]["next"]:
+            # every page is a single query, whatever its position
+            with self.assertNumQueries(1):
+                resp = self.client.get(pages[-1]["next"])
+            self.assertEqual(resp.status_code, status.HTTP_200_OK)
+            pages.append(resp.json())
+        self.assertEqual(
+            [vote["pk"] for page in pages for vote in page["results"]], expected
+        )
+
+        resp = self.client.get(pages[-1]["previous"])
+        self.assertEqual(resp.json()["results"], pages[-2]["results"])
+        self.assertEqual(resp.json()["next"], pages[-2]["next"])
+
+        resp = self.client.get(url, {"cursor": "not-a-cursor"})
+        self.assertEqual(resp.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_votes_list_fast_serializer(self):
+        self.client.force_authenticate(self.employee_user)
+        url = reverse("vote-list")
+        expected = self.client.get(url).json()
+        with override_settings(FAST_LIST_SERIALIZERS=True):
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.json(), expected)
+        self.assertEqual(resp.json()["results"], self.votes_data)
+
+    def test_export_votes(self):
+        Vote.objects.create(
+            restaurant=self.restaurant,
+            menu=self.menu1,
+            employee=self.employee_2,
+            date_voted=datetime.date.today() - datetime.timedelta(1),
+        )
+        url = reverse("vote-export")
+        self.client.force_authenticate(self.employee_user)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        admin = User.objects.create(username="admin", is_staff=True)
+        self.client.force_authenticate(admin)
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp["Content-Type"], "text/csv")
+        rows = list(
+            csv.DictReader(io.StringIO(b"".join(resp.streaming_content).decode()))
+        )
+        self.assertEqual([row["id"] for row in rows], ["2", "1"])
+        self.assertEqual(rows[1]["restaurant_name"], "restaurant1")
+        self.assertEqual(rows[1]["menu_title"], "Dish 1")
+        self.assertEqual(rows[1]["username"], "employee1")
+
+        resp = self.client.get(url, {"export_format": "ndjson", "employee": 1})
+        lines = b"".join(resp.streaming_content).decode().splitlines()
+        self.assertEqual(
+            [json.loads(line) for line in lines],
+            [
+                {
+                    "id": 1,
+                    "date_voted": str(datetime.date.today()),
+                    "restaurant_id": 1,
+                    "restaurant_name": "restaurant1",
+                    "menu_id": 1,
+                    "menu_title": "Dish 1",
+                    "employee_id": 1,
+                    "username": "employee1",
+                }
+            ],
+        )
+
+        out = io.StringIO()
+        call_command("export_votes", "--format", "csv", stdout=out)
+        self.assertEqual(
+            out.getvalue(), b"".join(self.client.get(url).streaming_content).decode()
+        )
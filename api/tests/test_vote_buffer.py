@@ -0,0 +1,185 @@
+from unittest import mock
+
+from django.db import IntegrityError, OperationalError
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.models import (Employee, Menu, Restaurant, RestaurantDailyTally, User,
+                        Vote)
+from api.utils import UserTypes
+from api.vote_buffer import VoteBuffer
+
+
+class VoteBufferTests(APITestCase):
+    """Tests for buffered vote-list POSTs"""
+
+    def setUp(self):
+        restaurant_user = User.objects.create(
+            user_type=UserTypes.RESTAURANT,
+            username="testrestaurant",
+            email="restaurant@test.com",
+        )
+        self.restaurant = Restaurant.objects.create(
+            user=restaurant_user, restaurant_name="restaurant1"
+        )
+        self.menu = Menu.objects.create(
+            restaurant=self.restaurant,
+            title="Dish 1",
+            description="Dish 1 ingredients.",
+        )
+        self.employee_user = User.objects.create(
+            user_type=UserTypes.EMPLOYEE,
+            username="employee1",
+            email="employee@test.com",
+        )
+        self.employee = Employee.objects.create(user=self.employee_user)
+        employee2_user = User.objects.create(
+            user_type=UserTypes.EMPLOYEE,
+            username="employee2",
+            email="employee2@test.com",
+        )
+        self.employee_2 = Employee.objects.create(user=employee2_user)
+        self.new_vote = {
+            "restaurant": self.restaurant.pk,
+            "employee": self.employee.pk,
+            "menu": self.menu.pk,
+        }
+        self.client.force_authenticate(self.employee_user)
+
+    def post_vote(self, vote_buffer):
+        with mock.patch("api.views.get_vote_buffer", return_value=vote_buffer):
+            return self.client.post(reverse("vote-list"), self.new_vote, format="json")
+
+    def test_buffered_vote_is_written_on_flush(self):
+        vote_buffer = VoteBuffer()
+        resp = self.post_vote(vote_buffer)
+        self.assertEqual(resp.status_code, status.HTTP_202_ACCEPTED)
+        self.assertIsNone(resp.json()["pk"])
+        self.assertFalse(Vote.objects.exists())
+
+        # the pending vote already counts for the duplicate check
+        resp = self.post_vote(vote_buffer)
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.assertEqual(vote_buffer.flush(), 1)
+        self.assertTrue(Vote.objects.filter(employee=self.employee).exists())
+        self.assertEqual(
+            RestaurantDailyTally.objects.get(restaurant=self.restaurant).vote_count, 1
+        )
+        resp = self.post_vote(vote_buffer)
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_drain_resolves_pending_votes(self):
+        vote_buffer = VoteBuffer(batch_size=1, durability=VoteBuffer.ACK_ON_FLUSH)
+        futures = [
+            vote_buffer.submit(
+                Vote(restaurant=self.restaurant, menu=self.menu, employee=employee)
+            )
+            for employee in (self.employee, self.employee_2)
+        ]
+        vote_buffer.drain()
+        self.assertEqual(
+            {future.result(0).pk for future in futures},
+            set(Vote.objects.values_list("pk", flat=True)),
+        )
+
+    def test_full_buffer_writes_synchronously(self):
+        vote_buffer = VoteBuffer(max_pending=1)
+        vote_buffer.submit(
+            Vote(restaurant=self.restaurant, menu=self.menu, employee=self.employee_2)
+        )
+        resp = self.post_vote(vote_buffer)
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(Vote.objects.filter(employee=self.employee).exists())
+
+    def test_flush_reconnects_after_lost_connection(self):
+        vote_buffer = VoteBuffer(durability=VoteBuffer.ACK_ON_FLUSH)
+        future = vote_buffer.submit(
+            Vote(restaurant=self.restaurant, menu=self.menu, employee=self.employee)
+        )
+        bulk_create = Vote.objects.bulk_create
+        results = [OperationalError("server closed the connection"), None]
+
+        def lose_connection_once(votes):
+            error = results.pop(0)
+            if error:
+                raise error
+            return bulk_create(votes)
+
+        with mock.patch.object(
+            Vote.objects, "bulk_create", side_effect=lose_connection_once
+        ), mock.patch("api.vote_buffer.connection") as connection:
+            connection.is_usable.return_value = False
+            vote_buffer.flush()
+        connection.close.assert_called_once_with()
+        self.assertEqual(future.result(0).employee, self.employee)
+        self.assertTrue(Vote.objects.filter(employee=self.employee).exists())
+
+    def test_write_errors_resolve_every_future(self):
+        employee3_user = User.objects.create(
+            user_type=UserTypes.EMPLOYEE,
+            username="employee3",
+            email="employee3@test.com",
+        )
+        employee_3 = Employee.objects.create(user=employee3_user)
+        vote_buffer = VoteBuffer(durability=VoteBuffer.ACK_ON_FLUSH)
+        futures = [
+            vote_buffer.submit(
+                Vote(restaurant=self.restaurant, menu=self.menu, employee=employee)
+            )
+            for employee in (self.employee, self.employee_2, employee_3)
+        ]
+        duplicate = IntegrityError(
+            "UNIQUE constraint failed: api_vote.employee_id, api_vote.date_voted"
+        )
+        save = Vote.save
+
+        def fail_first_rows(vote, *args, **kwargs):
+            if vote.employee_id == self.employee.pk:
+                raise IntegrityError("FOREIGN KEY constraint failed")
+            if vote.employee_id == self.employee_2.pk:
+                raise OperationalError("database is locked")
+            return save(vote, *args, **kwargs)
+
+        with mock.patch.object(
+            Vote.objects, "bulk_create", side_effect=duplicate
+        ), mock.patch.object(
+            Vote, "save", autospec=True, side_effect=fail_first_rows
+        ), self.assertLogs(
+            "api.vote_buffer", "ERROR"
+        ):
+            vote_buffer.flush()
+        self.assertIsInstance(futures[0].exception(0), IntegrityError)
+        self.assertIsInstance(futures[1].exception(0), OperationalError)
+        self.assertEqual(futures[2].result(0).employee, employee_3)
+        self.assertEqual(vote_buffer._pending, set())
+
+    def test_flusher_survives_failed_flushes(self):
+        vote_buffer = VoteBuffer(
+            durability=VoteBuffer.ACK_ON_FLUSH, flush_interval=0.01
+        )
+        failures = [OperationalError("server closed the connection")]
+
+        def fail_once():
+            if failures:
+                raise failures.pop()
+
+        with mock.patch(
+            "api.vote_buffer.close_old_connections", side_effect=fail_once
+        ), mock.patch.object(
+            Vote.objects,
+            "bulk_create",
+            side_effect=IntegrityError("FOREIGN KEY constraint failed"),
+        ), self.assertLogs(
+            "api.vote_buffer", "ERROR"
+        ):
+            vote_buffer.start()
+            future = vote_buffer.submit(
+                Vote(restaurant=self.restaurant, menu=self.menu, employee=self.employee)
+            )
+            self.assertIsInstance(future.exception(5), IntegrityError)
+            self.assertFalse(failures)
+            self.assertTrue(vote_buffer._thread.is_alive())
+            vote_buffer.drain(5)
+        self.assertFalse(vote_buffer._thread.is_alive())
@@ -1,11 +1,25 @@
+import asyncio
 import datetime
+import io
 
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections
+from django.test import override_settings
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
 
+from api.cache import winner_cache
 from api.constants import MAX_CONSECUTIVE_WINNINGS
-from api.models import Employee, Menu, Restaurant, User, Vote
+from api.leaderboard import leaderboard, stream_slots
+from api.models import (Employee, Menu, Restaurant, RestaurantDailyTally, User,
+                        Vote)
+from api.streaming import StreamingASGIHandler
 from api.utils import UserTypes
 
 
@@ -13,6 +27,7 @@ class WinningRestaurantTests(APITestCase):
     """Test for GET api for all the votes for today"""
 
     def setUp(self):
+        cache.clear()
         self.restaurant_data = {
             "username": "testrestaurant",
             "email": "restaurant@test.com",
@@ -115,3 +130,324 @@ class WinningRestaurantTests(APITestCase):
         resp = self.client.post(url, self.new_vote_emp1, format="json")
         self.assertEqual(self.consecutive_error, resp.json()["non_field_errors"])
         self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_winner_changed_in_between(self, *args):
+        """A restaurant that lost one of the last voting days can be voted."""
+        restaurant2_user = User(
+            user_type=UserTypes.RESTAURANT,
+            username="testrestaurant2",
+            email="restaurant2@test.com",
+        )
+        restaurant2_user.save()
+        restaurant2 = Restaurant.objects.create(
+            user=restaurant2_user, restaurant_name="restaurant2"
+        )
+        menu2 = Menu.objects.create(
+            restaurant=restaurant2, title="Dish 2", description="Dish 2 ingredients."
+        )
+        Vote.objects.filter(employee=1).delete()
+        for day in range(1, MAX_CONSECUTIVE_WINNINGS + 1):
+            date_voted = datetime.date.today() - datetime.timedelta(day)
+            winner, menu = (
+                (restaurant2, menu2) if day == 1 else (self.restaurant, self.menu1)
+            )
+            Vote.objects.create(
+                restaurant=winner,
+                menu=menu,
+                employee=self.employee,
+                date_voted=date_voted,
+            )
+
+        self.assertIsNone(
+            Vote.objects.consecutive_winner(
+                before=datetime.date.today(), times=MAX_CONSECUTIVE_WINNINGS
+            )
+        )
+        self.client.force_authenticate(self.employee_user)
+        url = reverse("vote-list")
+        resp = self.client.post(url, self.new_vote_emp1, format="json")
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+
+    def test_consecutive_winner_needs_enough_history(self, *args):
+        Vote.objects.filter(employee=1).delete()
+        Vote.objects.create(
+            restaurant=self.restaurant,
+            menu=self.menu1,
+            employee=self.employee,
+            date_voted=datetime.date.today() - datetime.timedelta(1),
+        )
+        self.assertIsNone(
+            Vote.objects.consecutive_winner(
+                before=datetime.date.today(), times=MAX_CONSECUTIVE_WINNINGS
+            )
+        )
+        self.assertEqual(
+            Vote.objects.consecutive_winner(before=datetime.date.today(), times=1),
+            self.restaurant.pk,
+        )
+
+    def test_tally_follows_votes(self, *args):
+        tally = RestaurantDailyTally.objects.get(
+            restaurant=self.restaurant, date=datetime.date.today()
+        )
+        self.assertEqual(tally.vote_count, 1)
+
+        self.client.force_authenticate(self.employee2_user)
+        url = reverse("vote-list")
+        new_vote_emp2 = {"restaurant": 1, "employee": 2, "menu": 1}
+        resp = self.client.post(url, new_vote_emp2, format="json")
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        tally.refresh_from_db()
+        self.assertEqual(tally.vote_count, 2)
+
+        Vote.objects.filter(employee=self.employee).delete()
+        tally.refresh_from_db()
+        self.assertEqual(tally.vote_count, 1)
+
+    def test_rebuild_tallies(self, *args):
+        RestaurantDailyTally.objects.update(vote_count=5)
+        call_command("rebuild_tallies", stdout=io.StringIO())
+        self.assertEqual(
+            list(
+                RestaurantDailyTally.objects.values_list("restaurant_id", "vote_count")
+            ),
+            [(self.restaurant.pk, 1)],
+        )
+
+    def test_leaderboard_stream(self, *args):
+        self.client.force_authenticate(self.employee_user)
+        resp = self.client.get(reverse("winning-restaurant-stream"))
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp["Content-Type"], "text/event-stream")
+        events = iter(resp.streaming_content)
+        self.assertIn(b'data: [{"restaurant_id": 1, "total_votes": 1}]', next(events))
+
+        self.client.force_authenticate(self.employee2_user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse("vote-list"),
+                {"restaurant": 1, "employee": 2, "menu": 1},
+                format="json",
+            )
+        self.assertIn(b'data: [{"restaurant_id": 1, "total_votes": 2}]', next(events))
+        resp.close()
+
+    @override_settings(LEADERBOARD_MAX_STREAMS=1)
+    def test_leaderboard_streams_limited(self, *args):
+        self.client.force_authenticate(self.employee_user)
+        resp = self.client.get(reverse("winning-restaurant-stream"))
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        other = self.client.get(reverse("winning-restaurant-stream"))
+        self.assertEqual(other.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        resp.close()
+        resp = self.client.get(reverse("winning-restaurant-stream"))
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        resp.close()
+
+    async def test_leaderboard_stream_under_asgi(self, *args):
+        # Like the test client, keep the test transaction's connection open.
+        for signal in (request_started, request_finished):
+            signal.disconnect(close_old_connections)
+            self.addCleanup(signal.connect, close_old_connections)
+        token = AccessToken.for_user(self.employee_user)
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": reverse("winning-restaurant-stream"),
+            "query_string": b"",
+            "headers": [
+                (b"host", b"testserver"),
+                (b"authorization", f"Bearer {token}".encode()),
+            ],
+        }
+        received, sent = asyncio.Queue(), asyncio.Queue()
+        await received.put({"type": "http.request"})
+        handler = asyncio.ensure_future(
+            StreamingASGIHandler()(scope, received.get, sent.put)
+        )
+        start = await asyncio.wait_for(sent.get(), 5)
+        self.assertEqual(start["status"], status.HTTP_200_OK)
+        body = await asyncio.wait_for(sent.get(), 5)
+        self.assertIn(b'data: [{"restaurant_id": 1, "total_votes": 1}]', body["body"])
+
+        # a vote committed by a worker thread wakes the stream on the loop
+        await sync_to_async(leaderboard.add, thread_sensitive=False)(
+            self.restaurant.pk, datetime.date.today(), 1
+        )
+        body = await asyncio.wait_for(sent.get(), 5)
+        self.assertIn(b'data: [{"restaurant_id": 1, "total_votes": 2}]', body["body"])
+
+        await received.put({"type": "http.disconnect"})
+        await asyncio.wait_for(handler, 5)
+        self.assertTrue(stream_slots.acquire())
+        stream_slots.release()
+
+    def test_winner_cache_not_stale_after_vote(self, *args):
+        restaurant2_user = User.objects.create(
+            user_type=UserTypes.RESTAURANT, username="testrestaurant2"
+        )
+        restaurant2 = Restaurant.objects.create(
+            user=restaurant2_user, restaurant_name="restaurant2"
+        )
+        menu2 = Menu.objects.create(
+            restaurant=restaurant2, title="Dish 2", description="Dish 2 ingredients."
+        )
+        self.client.force_authenticate(self.employee_user)
+        url = reverse("winning-restaurant-list")
+        winner_cache.reset_stats()
+        self.assertEqual(self.client.get(url).json()["results"], [self.fist_day_winner])
+        self.assertEqual(self.client.get(url).json()["results"], [self.fist_day_winner])
+        self.assertEqual(winner_cache.stats(), {"hits": 1, "misses": 1})
+
+        Vote.objects.filter(employee=self.employee).delete()
+        for employee in (self.employee, self.employee_2):
+            Vote.objects.create(restaurant=restaurant2, menu=menu2, employee=employee)
+        self.assertEqual(
+            self.client.get(url).json()["results"],
+            [{"restaurant_id": restaurant2.pk, "total_votes": 2}],
+        )
+        self.assertEqual(winner_cache.stats(), {"hits": 1, "misses": 2})
+
+    def test_winner_cache_discards_ranking_computed_before_commit(self, *args):
+        today = datetime.date.today()
+        # A reader computes the ranking, then a vote commits before it is
+        # stored. The stored ranking belongs to an older version.
+        version_key = winner_cache._key("version", today)
+        stale_version = (0, cache.get(version_key, 0))
+        with self.captureOnCommitCallbacks(execute=True):
+            Vote.objects.create(
+                restaurant=self.restaurant, menu=self.menu1, employee=self.employee_2
+            )
+        cache.set(
+            winner_cache._key("ranking", today),
+            (stale_version, [self.fist_day_winner], False),
+        )
+        self.assertEqual(
+            winner_cache.winner(today),
+            [{"restaurant_id": self.restaurant.pk, "total_votes": 2}],
+        )
+
+    def test_winner_for_date_and_range(self, *args):
+        restaurant2_user = User.objects.create(
+            user_type=UserTypes.RESTAURANT, username="testrestaurant2"
+        )
+        restaurant2 = Restaurant.objects.create(
+            user=restaurant2_user, restaurant_name="restaurant2"
+        )
+        menu2 = Menu.objects.create(
+            restaurant=restaurant2, title="Dish 2", description="Dish 2 ingredients."
+        )
+        today = datetime.date.today()
+        yesterday = today - datetime.timedelta(1)
+        before_yesterday = today - datetime.timedelta(3)
+        for employee in (self.employee, self.employee_2):
+            Vote.objects.create(
+                restaurant=restaurant2,
+                menu=menu2,
+                employee=employee,
+                date_voted=yesterday,
+            )
+        Vote.objects.create(
+            restaurant=self.restaurant,
+            menu=self.menu1,
+            employee=self.employee,
+            date_voted=before_yesterday,
+        )
+        self.client.force_authenticate(self.employee_user)
+        url = reverse("winning-restaurant-list")
+
+        resp = self.client.get(url, {"date": str(yesterday)})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            resp.json()["results"],
+            [{"restaurant_id": restaurant2.pk, "total_votes": 2}],
+        )
+
+        with self.assertNumQueries(1):
+            resp = self.client.get(
+                url, {"from": str(before_yesterday), "to": str(today)}
+            )
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            resp.json()["results"],
+            [
+                {
+                    "date": str(before_yesterday),
+                    "restaurant_id": self.restaurant.pk,
+                    "total_votes": 1,
+                },
+                {
+                    "date": str(yesterday),
+                    "restaurant_id": restaurant2.pk,
+                    "total_votes": 2,
+                },
+                {
+                    "date": str(today),
+                    "restaurant_id": self.restaurant.pk,
+                    "total_votes": 1,
+                },
+            ],
+        )
+
+    def test_winner_range_requires_valid_dates(self, *args):
+        self.client.force_authenticate(self.employee_user)
+        url = reverse("winning-restaurant-list")
+        today = datetime.date.today()
+        for params in (
+            {"date": "yesterday"},
+            {"from": str(today)},
+            {"from": str(today), "to": str(today - datetime.timedelta(1))},
+            {"from": str(today - datetime.timedelta(400)), "to": str(today)},
+            {"date": str(today), "from": str(today), "to": str(today)},
+        ):
+            resp = self.client.get(url, params)
+            self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+    def test_vote_analytics(self, *args):
+        restaurant2_user = User.objects.create(
+            user_type=UserTypes.RESTAURANT, username="testrestaurant2"
+        )
+        restaurant2 = Restaurant.objects.create(
+            user=restaurant2_user, restaurant_name="restaurant2"
+        )
+        menu2 = Menu.objects.create(
+            restaurant=restaurant2, title="Dish 2", description="Dish 2 ingredients."
+        )
+        today = datetime.date.today()
+        yesterday = today - datetime.timedelta(1)
+        Employee.objects.update(date_joined=timezone.now() - datetime.timedelta(30))
+        for employee in (self.employee, self.employee_2):
+            Vote.objects.create(
+                restaurant=restaurant2,
+                menu=menu2,
+                employee=employee,
+                date_voted=yesterday,
+            )
+        url = reverse("vote-analytics")
+        params = {"from": str(today - datetime.timedelta(90)), "to": str(today)}
+        self.client.force_authenticate(self.employee_user)
+        self.assertEqual(
+            self.client.get(url, params).status_code, status.HTTP_403_FORBIDDEN
+        )
+
+        admin = User.objects.create(username="admin", is_staff=True)
+        self.client.force_authenticate(admin)
+        with self.assertNumQueries(1):
+            resp = self.client.get(url, params)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            resp.json(),
+            {
+                "from": params["from"],
+                "to": params["to"],
+                "restaurants": [self.restaurant.pk, restaurant2.pk],
+                "days": [str(yesterday), str(today)],
+                "votes": [[0, 2], [1, 0]],
+                "participation": [1.0, 0.5],
+                "winners": [restaurant2.pk, self.restaurant.pk],
+            },
+        )
+        self.assertEqual(
+            self.client.get(url, {"from": params["from"]}).status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
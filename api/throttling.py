@@ -0,0 +1,252 @@
+"""Throttling of the token, vote and employee signup endpoints.
+
+The throttles count requests in a sliding window: the count of the current
+fixed window plus the count of the previous one, weighted by how much of
+it still overlaps the window ending now. By default the counters live in
+this process (``LocalWindowStore``), an LRU-bounded dict behind a lock
+costing a few microseconds per request. With several workers set
+``THROTTLE_STORE = {"BACKEND": "cache", "ALIAS": ...}`` to share them
+through a cache backend (``CacheWindowStore``) instead.
+
+Rates are the ``DEFAULT_THROTTLE_RATES`` of ``REST_FRAMEWORK`` named
+``<throttle_scope of the view>.<ip|claimed|user>``, a missing rate
+disables the throttle. ``ClientIPThrottle`` and ``ClaimedUserThrottle``
+count requests before they are authenticated, so together with
+``ThrottleBeforeAuthMixin`` a throttled request is rejected before any
+password is hashed. The username a request claims is not verified yet,
+so ``ClaimedUserThrottle`` counts it per client IP: nobody can use up the
+budget of another user's requests from other addresses. ``UserThrottle``
+counts per authenticated user, after authentication succeeded.
+"""
+
+import base64
+import binascii
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+DURATIONS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_rate(rate):
+    """Return ``(requests, seconds)`` of a rate like ``"30/min"``."""
+    num, period = rate.split("/")
+    return int(num), DURATIONS[period[0]]
+
+
+def window_estimate(current, previous, offset, duration):
+    """Requests in the sliding window ending ``offset`` seconds into the
+    current fixed window."""
+    return previous * (1 - offset / duration) + current
+
+
+def retry_after(estimate, limit, previous, offset, duration):
+    """Seconds until the sliding window allows another request."""
+    if previous:
+        # The previous window's weight decays at previous / duration per second.
+        wait = (estimate - limit) * duration / previous
+        return min(max(wait, 0), duration - offset)
+    return duration - offset
+
+
+class LocalWindowStore:
+    """Sliding window counters of this process, at most ``max_keys`` of
+    them. Beyond that the least recently hit key is dropped."""
+
+    max_keys = 100000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._windows = OrderedDict()
+
+    def hit(self, key, limit, duration):
+        """Count a request, or return the seconds to wait when ``limit``
+        requests were already made in the last ``duration`` seconds."""
+        window, offset = divmod(time.monotonic(), duration)
+        with self._lock:
+            current, previous = self._counts(key, window)
+            estimate = window_estimate(current, previous, offset, duration)
+            if estimate >= limit:
+                if key in self._windows:
+                    self._windows.move_to_end(key)
+                return retry_after(estimate, limit, previous, offset, duration)
+            self._windows[key] = (window, current + 1, previous)
+            self._windows.move_to_end(key)
+            if len(self._windows) > self.max_keys:
+                self._windows.popitem(last=False)
+        return None
+
+    def _counts(self, key, window):
+        entry = self._windows.get(key)
+        if entry is None or entry[0] < window - 1:
+            return 0, 0
+        if entry[0] == window - 1:
+            return 0, entry[1]
+        return entry[1], entry[2]
+
+    def clear(self):
+        with self._lock:
+            self._windows.clear()
+
+
+class CacheWindowStore:
+    """Sliding window counters shared through a cache backend, updated with
+    atomic ``incr``."""
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    def hit(self, key, limit, duration):
+        cache = caches[self.alias]
+        window, offset = divmod(time.time(), duration)
+        current_key = f"{key}:{int(window)}"
+        previous_key = f"{key}:{int(window) - 1}"
+        counts = cache.get_many([current_key, previous_key])
+        current = counts.get(current_key, 0)
+        previous = counts.get(previous_key, 0)
+        estimate = window_estimate(current, previous, offset, duration)
+        if estimate >= limit:
+            return retry_after(estimate, limit, previous, offset, duration)
+        cache.add(current_key, 0, duration * 2)
+        try:
+            cache.incr(current_key)
+        except ValueError:
+            # Evicted between add and incr.
+            cache.set(current_key, 1, duration * 2)
+        return None
+
+
+local_store = LocalWindowStore()
+
+
+def get_store():
+    config = settings.THROTTLE_STORE
+    if config["BACKEND"] == "cache":
+        return CacheWindowStore(config.get("ALIAS", "default"))
+    return local_store
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """Base of the throttles, subclasses return the ident to count in
+    ``get_ident``, ``None`` for requests they do not count. Throttles
+    ``before_authentication`` must not read ``request.user``."""
+
+    kind = None
+    before_authentication = False
+
+    def allow_request(self, request, view):
+        scope = f"{getattr(view, 'throttle_scope', None)}.{self.kind}"
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+        if rate is None:
+            return True
+        ident = self.get_ident(request)
+        if ident is None:
+            return True
+        limit, duration = parse_rate(rate)
+        self.wait_seconds = get_store().hit(
+            f"throttle:{scope}:{ident}", limit, duration
+        )
+        return self.wait_seconds is None
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class ClientIPThrottle(SlidingWindowThrottle):
+    kind = "ip"
+    before_authentication = True
+
+
+def credentials_username(request):
+    """The username a request claims by its credentials, before they are
+    verified: the user of HTTP Basic credentials or of a valid bearer
+    token."""
+    auth = request.META.get("HTTP_AUTHORIZATION", "").split()
+    if len(auth) == 2 and auth[0].lower() == "basic":
+        try:
+            decoded = base64.b64decode(auth[1]).decode("utf-8")
+        except (binascii.Error, UnicodeDecodeError):
+            return None
+        return decoded.partition(":")[0] or None
+    if len(auth) == 2 and auth[0].lower() == "bearer":
+        try:
+            return AccessToken(auth[1]).get(jwt_settings.USER_ID_CLAIM)
+        except TokenError:
+            return None
+    return None
+
+
+def data_username(request):
+    """The ``username`` of the request data, e.g. of a token request."""
+    data = request.data
+    if isinstance(data, Mapping) and isinstance(data.get("username"), str):
+        return data["username"]
+    return None
+
+
+CLAIMED_USERNAME_SOURCES = {
+    "credentials": credentials_username,
+    "data": data_username,
+}
+
+
+class ClaimedUserThrottle(SlidingWindowThrottle):
+    """Counts the username a request claims where the view will verify it,
+    the ``throttle_claim_source`` of the view: ``"credentials"`` (default)
+    for views authenticating the request, ``"data"`` for the token view."""
+
+    kind = "claimed"
+    before_authentication = True
+
+    def allow_request(self, request, view):
+        source = getattr(view, "throttle_claim_source", "credentials")
+        self.claimed_username = CLAIMED_USERNAME_SOURCES[source]
+        return super().allow_request(request, view)
+
+    def get_ident(self, request):
+        username = self.claimed_username(request)
+        if username is None:
+            return None
+        return f"{super().get_ident(request)}:{username}"
+
+
+class UserThrottle(SlidingWindowThrottle):
+    kind = "user"
+
+    def get_ident(self, request):
+        if not request.user.is_authenticated:
+            return None
+        return request.user.pk
+
+
+class ThrottleBeforeAuthMixin:
+    """Check the throttles ``before_authentication`` before authenticating
+    the request, the others after it."""
+
+    def perform_authentication(self, request):
+        self.check_throttle_group(request, before_authentication=True)
+        super().perform_authentication(request)
+
+    def check_throttles(self, request):
+        self.check_throttle_group(request, before_authentication=False)
+
+    def check_throttle_group(self, request, before_authentication):
+        durations = []
+        for throttle in self.get_throttles():
+            early = getattr(throttle, "before_authentication", False)
+            if early != before_authentication:
+                continue
+            if not throttle.allow_request(request, self):
+                durations.append(throttle.wait())
+        if durations:
+            waits = [wait for wait in durations if wait is not None]
+            self.throttled(request, max(waits, default=None))
@@ -1,9 +1,10 @@
 from django.urls import path
-from rest_framework_simplejwt.views import (TokenObtainPairView,
-                                            TokenRefreshView, TokenVerifyView)
+from rest_framework_simplejwt.views import TokenVerifyView
 
+from api import async_views
 from api.views import (EmployeeViewSet, MenuViewSet, RestaurantViewSet,
-                       VoteViewSet, WinnerViewSet)
+                       TokenObtainView, TokenRefreshClaimsView,
+                       VoteAnalyticsViewSet, VoteViewSet, WinnerViewSet)
 
 urlpatterns = [
     path(
@@ -27,6 +28,15 @@ urlpatterns = [
         ),
         name="employee-detail",
     ),
+    path(
+        "employee/import/",
+        EmployeeViewSet.as_view(
+            {
+                "post": "import_employees",
+            }
+        ),
+        name="employee-import",
+    ),
     path(
         "restaurant/",
         RestaurantViewSet.as_view(
@@ -69,6 +79,15 @@ urlpatterns = [
         ),
         name="menu-detail",
     ),
+    path(
+        "vote/analytics/",
+        VoteAnalyticsViewSet.as_view(
+            {
+                "get": "list",
+            }
+        ),
+        name="vote-analytics",
+    ),
     path(
         "winning_restaurant/",
         WinnerViewSet.as_view(
@@ -78,6 +97,20 @@ urlpatterns = [
         ),
         name="winning-restaurant-list",
     ),
+    path(
+        "winning_restaurant/stream/",
+        WinnerViewSet.as_view(
+            {
+                "get": "stream",
+            }
+        ),
+        name="winning-restaurant-stream",
+    ),
+    path(
+        "winning_restaurant/async/",
+        async_views.winning_restaurant,
+        name="winning-restaurant-async",
+    ),
     path(
         "vote/",
         VoteViewSet.as_view(
@@ -88,6 +121,29 @@ urlpatterns = [
         ),
         name="vote-list",
     ),
+    path(
+        "vote/bulk/",
+        VoteViewSet.as_view(
+            {
+                "post": "bulk_create",
+            }
+        ),
+        name="vote-bulk",
+    ),
+    path(
+        "vote/export/",
+        VoteViewSet.as_view(
+            {
+                "get": "export",
+            }
+        ),
+        name="vote-export",
+    ),
+    path(
+        "vote/async/",
+        async_views.vote_create,
+        name="vote-async",
+    ),
     path(
         "vote/<int:pk>",
         VoteViewSet.as_view(
@@ -99,12 +155,12 @@ urlpatterns = [
     ),
     path(
         "token/",
-        TokenObtainPairView.as_view(),
+        TokenObtainView.as_view(),
         name="token_obtain_pair",
     ),
     path(
         "token/refresh/",
-        TokenRefreshView.as_view(),
+        TokenRefreshClaimsView.as_view(),
         name="token_refresh",
     ),
     path(
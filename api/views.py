@@ -1,26 +1,216 @@
+import csv
 import datetime
+import hashlib
 import logging
-
-from django.db.models import Count
-from rest_framework import viewsets
-from rest_framework.permissions import AllowAny
-
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import status, viewsets
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import AllowAny, IsAdminUser
+from rest_framework.response import Response
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.views import (TokenObtainPairView,
+                                            TokenRefreshView)
+
+from api.analytics import vote_analytics
+from api.cache import table_versions, winner_cache
+from api.constants import MAX_EMPLOYEE_IMPORT_REQUEST_SIZE
+from api.exceptions import ServiceUnavailable
+from api.export import EXPORT_FORMATS, export_chunks
 from api.filters import MenuFilter, VoteFilter
-from api.models import Employee, Menu, Restaurant, Vote
+from api.leaderboard import (RankingStream, async_ranking_events, leaderboard,
+                             ranking_events, stream_slots)
+from api.models import Employee, Menu, Restaurant, RestaurantDailyTally, Vote
+from api.onboarding import IMPORT_FORMATS, read_rows
+from api.pagination import KeysetPagination
 from api.permissions import (EmployeeViewSetPermission, IsEmployeeUserOrAdmin,
                              MenuViewSetPermission,
                              RestaurantViewSetPermission)
-from api.serializers import (EmployeeProfileSerializer, MenuSerializer,
-                             RestaurantProfileSerializer, VoteSerializer,
+from api.routers import ReplicaReadMixin
+from api.serializers import (BulkVoteSerializer,
+                             ClaimsTokenObtainPairSerializer,
+                             ClaimsTokenRefreshSerializer, DateRangeSerializer,
+                             EmployeeImportSerializer,
+                             EmployeeProfileSerializer,
+                             EmployeeValuesSerializer, MenuSerializer,
+                             MenuValuesSerializer, RestaurantProfileSerializer,
+                             RestaurantValuesSerializer, VoteSerializer,
+                             VoteValuesSerializer, WinnerQuerySerializer,
                              WinnerSerializer)
+from api.streaming import AsyncStreamingHttpResponse
+from api.throttling import (ClaimedUserThrottle, ClientIPThrottle,
+                            ThrottleBeforeAuthMixin, UserThrottle)
+from api.vote_buffer import VoteBuffer, get_vote_buffer
 
 logger = logging.getLogger(__name__)
 
 
-class EmployeeViewSet(viewsets.ModelViewSet):
-    queryset = Employee.objects.all()
+class TokenObtainView(ThrottleBeforeAuthMixin, TokenObtainPairView):
+    """Obtain a refresh and access token pair carrying the user's claims."""
+
+    serializer_class = ClaimsTokenObtainPairSerializer
+    throttle_scope = "token"
+    throttle_classes = [ClientIPThrottle, ClaimedUserThrottle, UserThrottle]
+    # The credentials are in the body, an Authorization header is ignored.
+    throttle_claim_source = "data"
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        try:
+            serializer.is_valid(raise_exception=True)
+        except TokenError as exc:
+            raise InvalidToken(exc.args[0])
+        # The password proved who the user is, count the tokens issued to them.
+        request.user = serializer.user
+        self.check_throttles(request)
+        return Response(serializer.validated_data, status=status.HTTP_200_OK)
+
+
+class TokenRefreshClaimsView(TokenRefreshView):
+    """Refresh an access token with the user's current claims, refused once
+    the user is deactivated or deleted."""
+
+    serializer_class = ClaimsTokenRefreshSerializer
+
+
+class TableVersionMixin:
+    """Version of ``version_models``, read once per request so every use of
+    it in the response agrees. It is read before the rows and routed like
+    them, so rows read from a lagging replica are never older than it."""
+
+    version_models = ()
+
+    def get_table_version(self):
+        """Return ``(token, last_modified)``, see ``TableVersions.get``."""
+        if not hasattr(self, "_table_version"):
+            self._table_version = table_versions.get(*self.version_models)
+        return self._table_version
+
+
+class ConditionalGetMixin(TableVersionMixin):
+    """ETag and Last-Modified validators for ``list`` and ``retrieve`` from
+    the versions of ``version_models``, see ``api.cache.table_versions``.
+
+    A matching ``If-None-Match`` or ``If-Modified-Since`` on a list is
+    answered with 304 before the queryset runs. A detail still loads its
+    object for the object permission check, but skips serializing.
+    """
+
+    def list(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = super().list(request, *args, **kwargs)
+        return self.set_validators(response, etag, last_modified)
+
+    def retrieve(self, request, *args, **kwargs):
+        # Validators first, the object read after them from the same
+        # database is at least as new.
+        etag, last_modified = self.get_validators(request)
+        instance = self.get_object()
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = Response(self.get_serializer(instance).data)
+        return self.set_validators(response, etag, last_modified)
+
+    def get_validators(self, request):
+        token, last_modified = self.get_table_version()
+        # The list of today's menus also changes with the date.
+        today = datetime.date.today()
+        midnight = time.mktime(today.timetuple())
+        key = f"{token}:{request.get_full_path()}:{today}"
+        etag = quote_etag(hashlib.md5(key.encode()).hexdigest())
+        return etag, max(last_modified, int(midnight))
+
+    def set_validators(self, response, etag, last_modified):
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response["ETag"] = etag
+            response["Last-Modified"] = http_date(last_modified)
+        return response
+
+
+class SnapshotListMixin(TableVersionMixin):
+    """Serve ``list`` from rendered bytes cached per date, URL and version of
+    ``version_models``. A save or delete on those tables, by any worker,
+    starts a new version in the database, the next request renders and
+    stores the new snapshot. Until then requests only read the version."""
+
+    snapshot_timeout = 24 * 60 * 60
+
+    def use_snapshot(self, request):
+        return request.accepted_renderer.format == "json"
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_snapshot(request):
+            return super().list(request, *args, **kwargs)
+        token, _ = self.get_table_version()
+        uri = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+        key = f"snapshot:{type(self).__name__}:{datetime.date.today()}:{token}:{uri}"
+        content = cache.get(key)
+        if content is None:
+            response = super().list(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            content = request.accepted_renderer.render(
+                response.data, request.accepted_media_type, self.get_renderer_context()
+            )
+            cache.set(key, content, self.snapshot_timeout)
+        return HttpResponse(content, content_type=request.accepted_media_type)
+
+
+class ValuesListMixin:
+    """Serve ``list`` from ``values()`` rows through ``values_serializer_class``
+    when ``FAST_LIST_SERIALIZERS`` is on, skipping model instances and the
+    ``ModelSerializer`` field machinery. The JSON is the same."""
+
+    values_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        if not settings.FAST_LIST_SERIALIZERS:
+            return super().list(request, *args, **kwargs)
+        serializer_class = self.values_serializer_class
+        queryset = self.filter_queryset(self.get_queryset()).values(
+            *serializer_class.lookups
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer_class(page).data)
+        return Response(serializer_class(queryset).data)
+
+
+class EmployeeViewSet(
+    ThrottleBeforeAuthMixin,
+    ReplicaReadMixin,
+    ValuesListMixin,
+    viewsets.ModelViewSet,
+):
+    queryset = Employee.objects.select_related("user")
     serializer_class = EmployeeProfileSerializer
+    values_serializer_class = EmployeeValuesSerializer
     permission_classes = [EmployeeViewSetPermission]
+    throttle_scope = "signup"
+    throttle_classes = [ClientIPThrottle]
+
+    def get_throttles(self):
+        if self.action == "create":
+            return super().get_throttles()
+        return []
+
+    def get_permissions(self):
+        if self.action == "import_employees":
+            return [IsAdminUser()]
+        return super().get_permissions()
 
     def list(self, request, *args, **kwargs):
         logger.info(
@@ -53,10 +243,46 @@ class EmployeeViewSet(viewsets.ModelViewSet):
         logger.info(f"User {request.user} DELETE employee-detail for employee {pk}")
         return super().destroy(request, pk, *args, **kwargs)
 
+    def import_employees(self, request, *args, **kwargs):
+        """Create up to ``MAX_EMPLOYEE_IMPORT_REQUEST_SIZE`` employees from a
+        JSON list or an uploaded CSV or JSON ``file`` (``?import_format=``),
+        all of them or none. Larger imports go through the import_employees
+        command."""
+        rows = request.data
+        upload = request.FILES.get("file")
+        if upload is not None:
+            import_format = request.query_params.get("import_format", "csv")
+            if import_format not in IMPORT_FORMATS:
+                raise ValidationError(
+                    {"import_format": [f"Use one of {', '.join(IMPORT_FORMATS)}."]}
+                )
+            try:
+                rows = read_rows(import_format, upload)
+            except (ValueError, csv.Error) as exc:
+                raise ValidationError({"file": [str(exc)]})
+        # No process pool forked from a web worker, the passwords are hashed
+        # in this request.
+        serializer = EmployeeImportSerializer(
+            data=rows,
+            many=True,
+            context={"max_rows": MAX_EMPLOYEE_IMPORT_REQUEST_SIZE, "hash_workers": 0},
+        )
+        serializer.is_valid(raise_exception=True)
+        logger.info(
+            f"User {request.user} POST employee-import with"
+            f" {len(serializer.validated_data)} rows"
+        )
+        employees = serializer.save()
+        return Response({"created": len(employees)}, status=status.HTTP_201_CREATED)
+
 
-class RestaurantViewSet(viewsets.ModelViewSet):
-    queryset = Restaurant.objects.all()
+class RestaurantViewSet(
+    ReplicaReadMixin, ConditionalGetMixin, ValuesListMixin, viewsets.ModelViewSet
+):
+    queryset = Restaurant.objects.select_related("user")
     serializer_class = RestaurantProfileSerializer
+    values_serializer_class = RestaurantValuesSerializer
+    version_models = (Restaurant,)
     permission_classes = [RestaurantViewSetPermission]
 
     def list(self, request, *args, **kwargs):
@@ -91,12 +317,28 @@ class RestaurantViewSet(viewsets.ModelViewSet):
         return super().destroy(request, pk, *args, **kwargs)
 
 
-class MenuViewSet(viewsets.ModelViewSet):
+class MenuViewSet(
+    ReplicaReadMixin,
+    ConditionalGetMixin,
+    SnapshotListMixin,
+    ValuesListMixin,
+    viewsets.ModelViewSet,
+):
     queryset = Menu.objects.all()
     serializer_class = MenuSerializer
+    values_serializer_class = MenuValuesSerializer
+    version_models = (Menu,)
     filterset_class = MenuFilter
+    pagination_class = KeysetPagination
     permission_classes = [MenuViewSetPermission]
 
+    def use_snapshot(self, request):
+        """Only today's menus, the most read and the same for everyone."""
+        include_previous = request.query_params.get("include_previous", "false")
+        if include_previous.lower() in ("true", "1"):
+            return False
+        return super().use_snapshot(request)
+
     def list(self, request, *args, **kwargs):
         logger.info(
             f"User {request.user} GET menu-list with args {dict(request.query_params)}"
@@ -129,11 +371,32 @@ class MenuViewSet(viewsets.ModelViewSet):
         return super().destroy(request, pk, *args, **kwargs)
 
 
-class VoteViewSet(viewsets.ModelViewSet):
+class VoteViewSet(
+    ThrottleBeforeAuthMixin,
+    ReplicaReadMixin,
+    ValuesListMixin,
+    viewsets.ModelViewSet,
+):
     queryset = Vote.objects.all()
     filterset_class = VoteFilter
+    pagination_class = KeysetPagination
     serializer_class = VoteSerializer
+    values_serializer_class = VoteValuesSerializer
     permission_classes = [IsEmployeeUserOrAdmin]
+    throttle_scope = "vote"
+    throttle_classes = [ClientIPThrottle, ClaimedUserThrottle, UserThrottle]
+
+    def get_throttles(self):
+        if self.action in ("create", "bulk_create"):
+            return super().get_throttles()
+        return []
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == "retrieve":
+            # The object permission check compares the employee's user.
+            queryset = queryset.select_related("employee")
+        return queryset
 
     def list(self, request, *args, **kwargs):
         logger.info(
@@ -146,7 +409,71 @@ class VoteViewSet(viewsets.ModelViewSet):
             f"User {request.user} POST vote-list with args "
             f"{dict(request.query_params)} and data {request.data}"
         )
-        return super().create(request, *args, **kwargs)
+        vote_buffer = get_vote_buffer()
+        if vote_buffer is None:
+            return super().create(request, *args, **kwargs)
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return self.buffered_create(vote_buffer, serializer)
+
+    def buffered_create(self, vote_buffer, serializer):
+        """Hand a validated vote to the write-behind buffer and answer
+        according to its durability setting."""
+        vote = Vote(**serializer.validated_data)
+        future = vote_buffer.submit(vote)
+        if future is None:
+            # The buffer is full, write the vote on the request thread.
+            self.perform_create(serializer)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        if vote_buffer.durability == VoteBuffer.ACK_ON_FLUSH:
+            try:
+                vote = future.result(vote_buffer.flush_timeout)
+            except FutureTimeoutError:
+                logger.warning(f"Vote of employee {vote.employee_id} not flushed yet")
+            else:
+                return Response(
+                    self.get_serializer(vote).data, status=status.HTTP_201_CREATED
+                )
+        return Response(self.get_serializer(vote).data, status=status.HTTP_202_ACCEPTED)
+
+    def bulk_create(self, request, *args, **kwargs):
+        serializer = BulkVoteSerializer(
+            data=request.data, many=True, context=self.get_serializer_context()
+        )
+        serializer.is_valid(raise_exception=True)
+        logger.info(
+            f"User {request.user} POST vote-bulk with"
+            f" {len(serializer.validated_data)} votes"
+        )
+        results = serializer.save()
+        return Response(results, status=status.HTTP_200_OK)
+
+    def get_permissions(self):
+        if self.action == "export":
+            return [IsAdminUser()]
+        return super().get_permissions()
+
+    def export(self, request, *args, **kwargs):
+        """Stream every vote matching the filters as CSV or NDJSON
+        (``?export_format=``), oldest first. Unlike vote-list all days are
+        included by default."""
+        logger.info(
+            f"User {request.user} GET vote-export with args {dict(request.query_params)}"
+        )
+        export_format = request.query_params.get("export_format", "csv")
+        if export_format not in EXPORT_FORMATS:
+            raise ValidationError(
+                {"export_format": [f"Use one of {', '.join(EXPORT_FORMATS)}."]}
+            )
+        queryset = self.filter_queryset(self.get_queryset())
+        response = StreamingHttpResponse(
+            export_chunks(export_format, queryset),
+            content_type=EXPORT_FORMATS[export_format],
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="votes.{export_format}"'
+        )
+        return response
 
     def retrieve(self, request, pk, *args, **kwargs):
         logger.info(
@@ -156,20 +483,63 @@ class VoteViewSet(viewsets.ModelViewSet):
         return super().retrieve(request, pk, *args, **kwargs)
 
 
-class WinnerViewSet(viewsets.ModelViewSet):
-    queryset = (
-        Vote.objects.filter(date_voted=datetime.date.today())
-        .values("restaurant_id")
-        .annotate(total_votes=Count("restaurant_id"))
-        .order_by("-total_votes")[:1]
-    )
+class VoteAnalyticsViewSet(viewsets.ViewSet):
+    permission_classes = [IsAdminUser]
 
+    def list(self, request, *args, **kwargs):
+        logger.info(
+            f"User {request.user} GET vote-analytics "
+            f"with args {dict(request.query_params)}"
+        )
+        query = DateRangeSerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        return Response(
+            vote_analytics(query.validated_data["from"], query.validated_data["to"])
+        )
+
+
+class WinnerViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     serializer_class = WinnerSerializer
     permission_classes = [IsEmployeeUserOrAdmin]
 
+    def get_queryset(self):
+        return RestaurantDailyTally.objects.ranking(datetime.date.today())[:1]
+
     def list(self, request, *args, **kwargs):
         logger.info(
             f"User {request.user} GET winning-restaurant-list "
             f"with args {dict(request.query_params)}"
         )
-        return super().list(request, *args, **kwargs)
+        query = WinnerQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        if "from" in params:
+            winners = RestaurantDailyTally.objects.winners(params["from"], params["to"])
+        else:
+            winners = winner_cache.winner(params.get("date", datetime.date.today()))
+        page = self.paginate_queryset(winners)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    def stream(self, request, *args, **kwargs):
+        """Push today's full ranking as Server-Sent Events whenever a vote
+        lands, on at most ``LEADERBOARD_MAX_STREAMS`` streams per process.
+        Under ASGI the events are sent from the event loop, under WSGI every
+        open stream holds a worker thread, but no database connection."""
+        logger.info(f"User {request.user} GET winning-restaurant-stream")
+        if not stream_slots.acquire():
+            raise ServiceUnavailable("Too many open leaderboard streams.")
+        heartbeat = settings.LEADERBOARD_HEARTBEAT_SECONDS
+        if isinstance(request._request, ASGIRequest):
+            response = AsyncStreamingHttpResponse(
+                RankingStream(async_ranking_events(leaderboard, heartbeat)),
+                content_type="text/event-stream",
+            )
+        else:
+            response = StreamingHttpResponse(
+                RankingStream(ranking_events(leaderboard, heartbeat)),
+                content_type="text/event-stream",
+            )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
@@ -0,0 +1,218 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import (DatabaseError, IntegrityError, close_old_connections,
+                       connection)
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+from api.models import Vote
+
+logger = logging.getLogger(__name__)
+
+ALREADY_VOTED = "You have already voted for today."
+
+
+class VoteBuffer:
+    """Bounded in-process queue of accepted votes written in batches by a
+    background thread.
+
+    ``durability`` decides when a vote is acknowledged: ``ACK_ON_ENQUEUE``
+    answers as soon as the vote is queued (a crash loses queued votes),
+    ``ACK_ON_FLUSH`` waits until the batch holding the vote is committed.
+    Votes that are queued but not yet written are kept in a pending set, so
+    a second vote of the same employee is rejected before the flush.
+    """
+
+    ACK_ON_ENQUEUE = "enqueue"
+    ACK_ON_FLUSH = "flush"
+
+    def __init__(
+        self,
+        max_pending=10000,
+        batch_size=500,
+        flush_interval=0.05,
+        durability=ACK_ON_ENQUEUE,
+        flush_timeout=5,
+    ):
+        if durability not in (self.ACK_ON_ENQUEUE, self.ACK_ON_FLUSH):
+            raise ValueError(f"Unknown vote buffer durability {durability!r}.")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.durability = durability
+        self.flush_timeout = flush_timeout
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run, name="vote-buffer-flusher", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, vote):
+        """Queue an unsaved ``Vote`` and return a future resolved with the saved
+        vote, or ``None`` if the buffer is full and the vote must be written
+        synchronously."""
+        key = (vote.employee_id, vote.date_voted)
+        with self._lock:
+            if key in self._pending:
+                raise serializers.ValidationError(
+                    {api_settings.NON_FIELD_ERRORS_KEY: [ALREADY_VOTED]}
+                )
+            self._pending.add(key)
+        if Vote.objects.filter(
+            employee_id=vote.employee_id, date_voted=vote.date_voted
+        ).exists():
+            self._discard([key])
+            raise serializers.ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [ALREADY_VOTED]}
+            )
+        future = Future()
+        try:
+            self._queue.put_nowait((vote, future))
+        except queue.Full:
+            self._discard([key])
+            return None
+        return future
+
+    def flush(self, wait=0):
+        """Write up to ``batch_size`` queued votes, waiting at most ``wait``
+        seconds for the batch to fill. Returns the number of votes taken."""
+        batch = []
+        deadline = time.monotonic() + wait
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(
+                    self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                )
+            except queue.Empty:
+                break
+        if batch:
+            self._write(batch)
+        return len(batch)
+
+    def drain(self, timeout=None):
+        """Stop the flusher and write everything that is still queued."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        while self.flush():
+            pass
+
+    def _run(self):
+        try:
+            while not self._stopped.is_set():
+                # Like a request does, replace a connection past CONN_MAX_AGE
+                # or broken by the last flush.
+                try:
+                    close_old_connections()
+                    self.flush(wait=self.flush_interval)
+                except Exception:
+                    # Keep the flusher alive, _write already resolved the
+                    # futures of a batch it failed to write.
+                    logger.exception("Vote buffer flush failed")
+        finally:
+            connection.close()
+
+    def _insert(self, votes):
+        try:
+            Vote.objects.bulk_create(votes)
+        except IntegrityError:
+            raise
+        except DatabaseError:
+            if connection.is_usable():
+                raise
+            # The connection was lost, e.g. to a database restart. Retry once
+            # on a new one rather than losing the accepted votes.
+            logger.warning(f"Reconnecting to write {len(votes)} buffered votes")
+            connection.close()
+            Vote.objects.bulk_create(votes)
+
+    def _write(self, batch):
+        try:
+            try:
+                self._insert([vote for vote, _ in batch])
+            except IntegrityError as exc:
+                if not Vote.is_duplicate_error(exc):
+                    raise
+                # Another worker inserted one of these votes, save them one by
+                # one so only the duplicates are rejected.
+                self._write_each(batch)
+            else:
+                for vote, future in batch:
+                    future.set_result(vote)
+        except Exception as exc:
+            logger.exception(f"Failed to write {len(batch)} buffered votes")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+        finally:
+            self._discard([(vote.employee_id, vote.date_voted) for vote, _ in batch])
+
+    def _write_each(self, batch):
+        for vote, future in batch:
+            try:
+                vote.save()
+            except IntegrityError as exc:
+                if not Vote.is_duplicate_error(exc):
+                    self._fail(vote, future, exc)
+                    continue
+                future.set_exception(
+                    serializers.ValidationError(
+                        {api_settings.NON_FIELD_ERRORS_KEY: [ALREADY_VOTED]}
+                    )
+                )
+                logger.warning(
+                    f"Dropped buffered vote of employee {vote.employee_id}"
+                    f" on {vote.date_voted}, already voted"
+                )
+            except Exception as exc:
+                self._fail(vote, future, exc)
+            else:
+                future.set_result(vote)
+
+    def _fail(self, vote, future, exc):
+        logger.exception(
+            f"Failed to write buffered vote of employee {vote.employee_id}"
+            f" on {vote.date_voted}"
+        )
+        future.set_exception(exc)
+
+    def _discard(self, keys):
+        with self._lock:
+            self._pending.difference_update(keys)
+
+
+_vote_buffer = None
+_vote_buffer_lock = threading.Lock()
+
+
+def get_vote_buffer():
+    """Return the process wide vote buffer, or ``None`` when
+    ``VOTE_BUFFER["ENABLED"]`` is off. The flusher starts on first use and
+    queued votes are drained when the process exits."""
+    global _vote_buffer
+    config = getattr(settings, "VOTE_BUFFER", {})
+    if not config.get("ENABLED"):
+        return None
+    with _vote_buffer_lock:
+        if _vote_buffer is None:
+            _vote_buffer = VoteBuffer(
+                max_pending=config.get("MAX_PENDING", 10000),
+                batch_size=config.get("BATCH_SIZE", 500),
+                flush_interval=config.get("FLUSH_INTERVAL_MS", 50) / 1000,
+                durability=config.get("DURABILITY", VoteBuffer.ACK_ON_ENQUEUE),
+                flush_timeout=config.get("FLUSH_TIMEOUT_MS", 5000) / 1000,
+            )
+            _vote_buffer.start()
+            atexit.register(_vote_buffer.drain)
+    return _vote_buffer
@@ -1,7 +1,8 @@
 """
 ASGI config for restaurant_selection project.
 
-It exposes the ASGI callable as a module-level variable named ``application``.
+It exposes the ASGI callable as a module-level variable named ``application``,
+a handler that also sends the async streaming responses of api.streaming.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
@@ -9,8 +10,11 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "settings.settings_dev")
+django.setup(set_prefix=False)
 
-application = get_asgi_application()
+from api.streaming import StreamingASGIHandler  # noqa: E402
+
+application = StreamingASGIHandler()
@@ -84,9 +84,9 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.BasicAuthentication",
+        "api.authentication.CachedBasicAuthentication",
         "rest_framework.authentication.SessionAuthentication",
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "api.authentication.ClaimsJWTAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
@@ -97,6 +97,19 @@ REST_FRAMEWORK = {
     ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
     "PAGE_SIZE": 50,
+    # Rates of the api.throttling throttles, <view throttle_scope>.<kind>:
+    # per client IP, per IP and claimed username before authenticating, and
+    # per authenticated user. Per IP rates are high as a whole office may
+    # share one address.
+    "DEFAULT_THROTTLE_RATES": {
+        "token.ip": "120/min",
+        "token.claimed": "10/min",
+        "token.user": "10/min",
+        "vote.ip": "600/min",
+        "vote.claimed": "30/min",
+        "vote.user": "30/min",
+        "signup.ip": "30/hour",
+    },
 }
 
 
@@ -160,6 +173,74 @@ SIMPLE_JWT = {
     "SLIDING_TOKEN_REFRESH_LIFETIME": timedelta(days=5),
 }
 
+# Serve the employee, restaurant, menu and vote lists from values() rows,
+# see api.views.ValuesListMixin.
+FAST_LIST_SERIALIZERS = False
+
+# Write-behind buffer for vote-list POSTs, see api.vote_buffer.VoteBuffer.
+# DURABILITY is "enqueue" (answer 202 once queued) or "flush" (answer 201 once
+# the batch holding the vote is committed, 202 after FLUSH_TIMEOUT_MS).
+VOTE_BUFFER = {
+    "ENABLED": False,
+    "MAX_PENDING": 10000,
+    "BATCH_SIZE": 500,
+    "FLUSH_INTERVAL_MS": 50,
+    "FLUSH_TIMEOUT_MS": 5000,
+    "DURABILITY": "enqueue",
+}
+
+# Threads (and so database connections) per process used by the async views
+# in api.async_views for ORM work.
+ASYNC_DB_WORKERS = 10
+
+# Processes hashing the passwords of an employee import, see api.onboarding.
+# None uses every core, 0 hashes in the importing process.
+EMPLOYEE_IMPORT_WORKERS = None
+
+# Live leaderboard stream (winning_restaurant/stream/), see api.leaderboard.
+# Under WSGI every open stream holds a worker thread, under ASGI
+# (restaurant_selection/asgi.py) the streams wait on the event loop.
+LEADERBOARD_RESYNC_SECONDS = 5
+LEADERBOARD_HEARTBEAT_SECONDS = 15
+LEADERBOARD_MAX_STREAMS = 100
+
+# Read replicas, see api.routers. List and retrieve requests read from one
+# of the DATABASE_REPLICAS aliases, except for users who wrote something in
+# the last READ_YOUR_WRITES["SECONDS"]. Their writes are remembered in the
+# READ_YOUR_WRITES["ALIAS"] cache, which has to be shared by all workers.
+DATABASE_ROUTERS = ["api.routers.ReadReplicaRouter"]
+DATABASE_REPLICAS = []
+READ_YOUR_WRITES = {
+    "ALIAS": "default",
+    "SECONDS": 5,
+}
+
+# Counters of the API throttles, see api.throttling. Per process by default,
+# {"BACKEND": "cache", "ALIAS": "default"} shares them through a cache.
+THROTTLE_STORE = {"BACKEND": "local"}
+
+# Local memory caches are per process. Point "default" at a shared backend
+# (e.g. django.core.cache.backends.memcached.PyMemcacheCache) when running
+# several workers so cache invalidations reach all of them.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+# Cached daily ranking of the winning-restaurant API, see api.cache.
+WINNER_CACHE = {
+    "ALIAS": "default",
+    "TIMEOUT": 300,
+}
+
+# Verified HTTP Basic credentials, see api.authentication. A password change
+# through the API or anywhere else ends their reuse right away.
+BASIC_AUTH_CACHE = {
+    "ALIAS": "default",
+    "TIMEOUT": 60,
+}
+
 SWAGGER_SETTINGS = {
     "SECURITY_DEFINITIONS": {"basic": {"type": "basic"}},
     "LOGIN_URL": "/accounts/login/",
@@ -16,6 +16,22 @@ DATABASES = {
     }
 }
 
+if os.environ.get("DB_REPLICA_HOST"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "HOST": os.environ["DB_REPLICA_HOST"],
+    }
+    DATABASE_REPLICAS = ["replica"]
+    # Shared by all workers, create the table with ./manage.py createcachetable.
+    CACHES = {
+        **CACHES,
+        "shared": {
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "LOCATION": "api_cache",
+        },
+    }
+    READ_YOUR_WRITES = {**READ_YOUR_WRITES, "ALIAS": "shared"}
+
 
 LOGGING = {
     "version": 1,
@@ -6,5 +6,19 @@ from .settings_base import *
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
-    }
+    },
+    # A separate database standing in for a replica in the routing tests,
+    # which set DATABASE_REPLICAS.
+    "replica": {
+        "ENGINE": "django.db.backends.sqlite3",
+    },
 }
+
+# Run the async views' ORM work on the thread that holds the test transaction.
+ASYNC_DB_WORKERS = 0
+
+# Hash imported passwords in the test process.
+EMPLOYEE_IMPORT_WORKERS = 0
+
+# No throttling, the throttle tests set their own rates.
+REST_FRAMEWORK = {**REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": {}}